@@ -4,7 +4,9 @@ Handles loading and managing configuration from JSON files.
 """
 
 # Standard library imports
+import os
 import json
+import marshal
 from pathlib import Path
 
 # Define log levels mapping
@@ -25,22 +27,75 @@ parent_path = Path(__file__).parent
 log_path = (parent_path / "../etc/logfile.log").resolve()
 conf_path = (parent_path / "../etc/config.conf").resolve()
 defaults_path = (parent_path / "../etc/config.def.conf").resolve()
+snapshot_path = (parent_path / "../etc/config.snapshot").resolve()
 
-# Load configuration
-try:
-    with open(conf_path) as json_data:
-        config = json.load(json_data)
-except (FileNotFoundError, json.JSONDecodeError):
-    config = {}
+def _stamp(path):
+    """Identify the version of a file by its modification time and size."""
+    try:
+        stat = path.stat()
+    except OSError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+def load():
+    """Load the configuration and its defaults.
+    
+    The parsed files are kept in a marshal snapshot, which is used as long
+    as neither file has been modified since it was written.
+    
+    Returns:
+        tuple: (config, defaults) dictionaries
+    """
+    stamps = (_stamp(conf_path), _stamp(defaults_path))
+    try:
+        with open(snapshot_path, "rb") as f:
+            saved_stamps, config, defaults = marshal.loads(f.read())
+        if saved_stamps == stamps:
+            return config, defaults
+    except (OSError, EOFError, ValueError, TypeError):
+        pass
+        
+    # Load configuration
+    try:
+        with open(conf_path) as json_data:
+            config = json.load(json_data)
+    except (FileNotFoundError, json.JSONDecodeError):
+        config = {}
+        
+    # Load defaults
+    with open(defaults_path) as json_data:
+        defaults = json.load(json_data)
+        
+    try:
+        temp_path = snapshot_path.with_suffix(f".{os.getpid()}.tmp")
+        with open(temp_path, "wb") as f:
+            marshal.dump((stamps, config, defaults), f)
+        os.replace(temp_path, snapshot_path)
+    except (OSError, ValueError):
+        pass  # Read-only install, or a value marshal can't store
+    return config, defaults
 
-# Load defaults
-with open(defaults_path) as json_data:
-    defaults = json.load(json_data)
+config, defaults = load()
 
 # Initialize configuration variables with fallbacks to defaults
 max_log_size = config.get('max_log_size', defaults['max_log_size'])
+max_cache_size = config.get('max_cache_size', defaults['max_cache_size'])
+page_cache_size = config.get('page_cache_size', defaults['page_cache_size'])
+page_cache_persist = config.get('page_cache_persist', defaults['page_cache_persist'])
 max_log_backups = config.get('max_log_backups', defaults['max_log_backups'])
 
+# HTTP connection pool sizes (number of host pools, connections kept per host)
+pool_connections = config.get('pool_connections', defaults['pool_connections'])
+pool_maxsize = config.get('pool_maxsize', defaults['pool_maxsize'])
+
+# HTTP timeouts in seconds
+connect_timeout = config.get('connect_timeout', defaults['connect_timeout'])
+read_timeout = config.get('read_timeout', defaults['read_timeout'])
+
+# DNS cache lifetimes in seconds for found and nonexistent hosts
+dns_cache_ttl = config.get('dns_cache_ttl', defaults['dns_cache_ttl'])
+dns_negative_ttl = config.get('dns_negative_ttl', defaults['dns_negative_ttl'])
+
 # Get log levels with fallbacks
 try:
     log_level_tty = LOGLEVELS[config['terminal_logger_level']]
@@ -52,6 +107,47 @@ try:
 except (KeyError, TypeError):
     log_level_file = LOGLEVELS[defaults['file_logger_level']]
 
+# HTML parser backend (html.parser, lxml or selectolax)
+parser_backend = config.get('parser_backend', defaults['parser_backend'])
+
+# Display pages incrementally while they download (html.parser backend only)
+streaming = config.get('streaming', defaults['streaming'])
+
+# Link prefetching (prefetch_workers or prefetch_max_bytes of 0 disables it)
+prefetch_links = config.get('prefetch_links', defaults['prefetch_links'])
+prefetch_workers = config.get('prefetch_workers', defaults['prefetch_workers'])
+prefetch_max_bytes = config.get('prefetch_max_bytes', defaults['prefetch_max_bytes'])
+prefetch_host_delay = config.get('prefetch_host_delay', defaults['prefetch_host_delay'])
+# Seconds a prefetched page may wait to be followed, at most its max-age
+prefetch_ttl = config.get('prefetch_ttl', defaults['prefetch_ttl'])
+
+# Memory cap for the page snapshots kept in the back/forward history
+history_max_bytes = config.get('history_max_bytes', defaults['history_max_bytes'])
+
+# Pages of at least lazy_parse_min_size characters are parsed as they are scrolled
+# into view, lazy_parse_lookahead lines ahead of the screen (0 disables it)
+lazy_parse_min_size = config.get('lazy_parse_min_size', defaults['lazy_parse_min_size'])
+lazy_parse_lookahead = config.get('lazy_parse_lookahead', defaults['lazy_parse_lookahead'])
+
+# Find in page: regex mode by default, smart case, and the page size (in lines)
+# from which searching waits for a pause in typing
+search_regex = config.get('search_regex', defaults['search_regex'])
+search_smart_case = config.get('search_smart_case', defaults['search_smart_case'])
+search_debounce_lines = config.get('search_debounce_lines', defaults['search_debounce_lines'])
+
+# Headless batch mode: pages fetched at once, in total and per host, and parser
+# processes (0 uses one per CPU core)
+batch_fetch_workers = config.get('batch_fetch_workers', defaults['batch_fetch_workers'])
+batch_per_host = config.get('batch_per_host', defaults['batch_per_host'])
+batch_parse_workers = config.get('batch_parse_workers', defaults['batch_parse_workers'])
+
+# Record how long each phase of a page load takes and log it (the performance
+# overlay also turns this on while it is shown)
+perf_spans = config.get('perf_spans', defaults['perf_spans'])
+
+# Save the history and open pages on exit and bring them back on the next start
+session_restore = config.get('session_restore', defaults['session_restore'])
+
 # Get control style with fallback
 try:
     tui_controls = config["controls"]
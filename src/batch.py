@@ -0,0 +1,181 @@
+"""
+Headless batch rendering module for SPyB.
+Fetches a list of URLs and writes out their text as the browser shows it,
+without the curses interface.
+
+Usage:
+    python3 src/batch.py [URL_FILE] [--format text|jsonl] [--output FILE]
+
+URLs are read one per line from URL_FILE, or from stdin if it is omitted or
+"-". Blank lines and lines starting with # are skipped.
+"""
+
+# Standard library imports
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+# Local imports
+import app_confvars as confvars
+import fetcher
+import parser
+
+class HostLimiter:
+    """Caps the number of requests in flight to each host."""
+
+    def __init__(self, per_host):
+        self.per_host = max(1, per_host)
+        self.lock = threading.Lock()
+        self.slots = {}  # host -> BoundedSemaphore
+
+    def slot(self, url):
+        """Return the semaphore guarding requests to the host of a URL."""
+        parsed = fetcher.parseURL(url)
+        host = parsed.host if parsed is not None else ""
+        with self.lock:
+            if host not in self.slots:
+                self.slots[host] = threading.BoundedSemaphore(self.per_host)
+            return self.slots[host]
+
+def readUrls(stream):
+    """Return the URLs listed in a text stream, skipping blanks and # comments."""
+    urls = []
+    for line in stream:
+        line = line.strip()
+        if line and not line.startswith('#'):
+            urls.append(line)
+    return urls
+
+def renderText(body, url):
+    """Parse a page into its display text. Runs in a parser process.
+
+    Returns:
+        tuple: (text, line_count, seconds spent parsing)
+    """
+    start = time.perf_counter()
+    text, line_count = parser.parse(body, base_url=url)
+    return text, line_count, time.perf_counter() - start
+
+def _errorText(result):
+    """Describe a failed fetcher() result."""
+    if result == "SSLERR":
+        return "SSL Error"
+    if isinstance(result, tuple) and result and result[0] == "ERROR":
+        return f"HTTP {result[1]} {result[2]}"
+    return "Request Failed"
+
+def renderUrl(url, limiter, parse_pool, verify=True):
+    """Fetch and render one URL.
+
+    Args:
+        url (str): URL to render
+        limiter (HostLimiter): Per-host request cap
+        parse_pool (ProcessPoolExecutor): Pool the page is parsed in
+        verify (bool): Verify SSL certificates
+
+    Returns:
+        dict: Record with the url, status ("ok" or "error"), error, http_status,
+            bytes, lines, fetch_ms, parse_ms, total_ms and text
+    """
+    record = {"url": url, "status": "error", "error": None, "http_status": None,
+              "bytes": 0, "lines": 0, "fetch_ms": 0.0, "parse_ms": 0.0, "total_ms": 0.0, "text": ""}
+    start = time.perf_counter()
+    try:
+        with limiter.slot(url):
+            body = fetcher.fetcher(url, verify=verify)
+        record["fetch_ms"] = round((time.perf_counter() - start) * 1000, 1)
+        if isinstance(body, tuple) and body and body[0] == "ERROR":
+            record["http_status"] = body[1]
+        if not isinstance(body, str):
+            record["error"] = _errorText(body)
+        else:
+            record["http_status"] = record["http_status"] or 200
+            record["bytes"] = len(body.encode('utf-8', 'surrogatepass'))
+            text, line_count, parse_seconds = parse_pool.submit(renderText, body, url).result()
+            record.update(status="ok", text=text, lines=line_count, parse_ms=round(parse_seconds * 1000, 1))
+    except Exception as e:  # One bad page must not stop the batch
+        record["error"] = f"{type(e).__name__}: {e}"
+    record["total_ms"] = round((time.perf_counter() - start) * 1000, 1)
+    return record
+
+def writeRecord(out, record, fmt):
+    """Write one rendered page in the chosen output format."""
+    if fmt == "jsonl":
+        out.write(json.dumps(record, ensure_ascii=False) + "\n")
+        return
+    if record["status"] == "ok":
+        summary = f"ok, {record['lines']} lines, fetch {record['fetch_ms']} ms, parse {record['parse_ms']} ms"
+    else:
+        summary = f"error: {record['error']}, {record['total_ms']} ms"
+    out.write(f"==> {record['url']} ({summary}) <==\n")
+    if record["text"]:
+        out.write(record["text"] + "\n")
+    out.write("\n")
+
+def run(urls, out, fmt="text", fetch_workers=None, per_host=None, parse_workers=None, verify=True):
+    """Render a list of URLs, writing the results in input order as they are ready.
+
+    Pages are fetched by a thread pool, at most ``per_host`` at a time from
+    any one host, and parsed in a pool of processes so parsing uses every
+    core.
+
+    Returns:
+        int: Number of URLs that failed
+    """
+    fetch_workers = fetch_workers or confvars.batch_fetch_workers
+    per_host = per_host or confvars.batch_per_host
+    parse_workers = parse_workers or confvars.batch_parse_workers or os.cpu_count() or 1
+    limiter = HostLimiter(per_host)
+    failed = 0
+    # Parser processes are spawned, not forked from this threaded process
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(parse_workers, mp_context=context) as parse_pool, \
+            ThreadPoolExecutor(fetch_workers, thread_name_prefix="spyb-batch") as fetch_pool:
+        futures = [fetch_pool.submit(renderUrl, url, limiter, parse_pool, verify) for url in urls]
+        for future in futures:
+            record = future.result()
+            if record["status"] != "ok":
+                failed += 1
+            writeRecord(out, record, fmt)
+            out.flush()
+    fetcher.closeSession()
+    return failed
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(
+        prog="batch.py",
+        description="Render web pages to plain text without the browser interface."
+    )
+    arg_parser.add_argument("url_file", nargs="?", default="-",
+                            help="file with one URL per line (default: stdin)")
+    arg_parser.add_argument("-f", "--format", choices=("text", "jsonl"), default="text",
+                            help="output format (default: text)")
+    arg_parser.add_argument("-o", "--output", default="-", help="output file (default: stdout)")
+    arg_parser.add_argument("--fetch-workers", type=int, help="pages fetched at once")
+    arg_parser.add_argument("--per-host", type=int, help="pages fetched at once from one host")
+    arg_parser.add_argument("--parse-workers", type=int, help="parser processes (default: one per core)")
+    arg_parser.add_argument("--insecure", action="store_true", help="do not verify SSL certificates")
+    args = arg_parser.parse_args(argv)
+
+    if args.url_file == "-":
+        urls = readUrls(sys.stdin)
+    else:
+        with open(args.url_file, encoding="utf-8") as url_file:
+            urls = readUrls(url_file)
+
+    out = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    try:
+        failed = run(urls, out, args.format, args.fetch_workers, args.per_host,
+                     args.parse_workers, verify=not args.insecure)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
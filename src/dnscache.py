@@ -0,0 +1,111 @@
+"""
+DNS cache module for SPyB.
+Resolves host names once and shares the answer between the host check in
+fetcher.getHost and the HTTP connection layer.
+"""
+
+# Standard library imports
+import time
+import socket
+import threading
+
+# Local imports
+import app_confvars as confvars
+import timing
+
+# getaddrinfo errors meaning the name does not exist (worth caching)
+NXDOMAIN_ERRORS = {socket.EAI_NONAME, getattr(socket, "EAI_NODATA", socket.EAI_NONAME)}
+
+# urllib3's own connection function, wrapped by create_connection(); set by install()
+_create_connection = None
+
+class Resolver:
+    """In-process DNS cache.
+
+    Successful lookups are kept for ``ttl`` seconds. Names that do not exist
+    are remembered for ``negative_ttl`` seconds, so a mistyped host fails
+    instantly on retry. Temporary failures are never cached.
+    """
+
+    def __init__(self, ttl=None, negative_ttl=None):
+        self.ttl = confvars.dns_cache_ttl if ttl is None else ttl
+        self.negative_ttl = confvars.dns_negative_ttl if negative_ttl is None else negative_ttl
+        self.entries = {}  # host -> (expiry, addresses or gaierror)
+        self.lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "negative_hits": 0}
+
+    def resolve(self, host):
+        """Resolve a host name, using the cache when possible.
+
+        Args:
+            host (str): Host name or IP literal
+
+        Returns:
+            list: (family, address) pairs in preference order
+
+        Raises:
+            socket.gaierror: If the name cannot be resolved
+        """
+        now = time.monotonic()
+        with self.lock:
+            cached = self.entries.get(host)
+            if cached is not None and cached[0] > now:
+                if isinstance(cached[1], socket.gaierror):
+                    self.stats["negative_hits"] += 1
+                    raise cached[1]
+                self.stats["hits"] += 1
+                return cached[1]
+            self.stats["misses"] += 1
+
+        try:
+            infos = socket.getaddrinfo(host, None, socket.AF_UNSPEC, socket.SOCK_STREAM)
+        except socket.gaierror as e:
+            if e.errno in NXDOMAIN_ERRORS and self.negative_ttl > 0:
+                with self.lock:
+                    self.entries[host] = (now + self.negative_ttl, e)
+            raise
+
+        addresses = []
+        for family, _, _, _, sockaddr in infos:
+            if (family, sockaddr[0]) not in addresses:
+                addresses.append((family, sockaddr[0]))
+        if self.ttl > 0:
+            with self.lock:
+                self.entries[host] = (now + self.ttl, addresses)
+        return addresses
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+# Shared resolver instance
+resolver = Resolver()
+
+@timing.timed("connect")
+def create_connection(address, *args, **kwargs):
+    """Drop-in replacement for urllib3's create_connection using the DNS cache.
+
+    Args:
+        address (tuple): (host, port) to connect to
+        *args, **kwargs: Passed on to urllib3's create_connection
+
+    Returns:
+        socket.socket: Connected socket
+    """
+    host, port = address
+    error = None
+    for _, ip in resolver.resolve(host):
+        try:
+            # Connecting to an IP literal does not trigger another lookup
+            return _create_connection((ip, port), *args, **kwargs)
+        except OSError as e:
+            error = e
+    raise error if error is not None else OSError(f"No addresses found for {host}")
+
+def install():
+    """Route urllib3 (and therefore requests) connections through the cache."""
+    global _create_connection
+    import urllib3.util.connection
+    if _create_connection is None:
+        _create_connection = urllib3.util.connection.create_connection
+    urllib3.util.connection.create_connection = create_connection
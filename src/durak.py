@@ -5,7 +5,6 @@ import time
 import colorama
 try: #Checks for the existance of the colorama library
 	from colorama import Fore, Back, Style
-	colorama.init()
 except:
 	print("Missing Dependency: Colorama. Please install the most recent version of colorama")
 	quit()
@@ -35,15 +34,20 @@ class Player():
 suits = ["♥ Hearts", "♦ Diamonds", "♠ Spades", "♣ Clubs"]
 ranks = {6: " 6", 7: " 7", 8: " 8", 9: " 9", 10: "10", 11: " J", 12: " Q", 13: " K", 14: " A"}
 
-deck = [Card(suit, rank, f"│{suit[0]}{face}│") for suit in suits for rank, face in ranks.items()]
+trumpsuit = None
 
-#The Decks shuffled, hands given
-random.shuffle(deck)
-trumpsuit = deck[0].suit
+#The deck is created and shuffled when a game starts, so importing this module has no side effects
+def deal():
+    global deck, trumpsuit
+    deck = [Card(suit, rank, f"│{suit[0]}{face}│") for suit in suits for rank, face in ranks.items()]
+    random.shuffle(deck)
+    trumpsuit = deck[0].suit
 
 def durak():
     global playerAmount
     playerAmount = 0
+    colorama.init()
+    deal()
 
     # Player Amount input: Continues the loop if an invalid amount of players is given, or if an exception would occur. 
     # "quit" is used because Ctrl-C is accesible during this loop.
@@ -4,60 +4,205 @@ Provides functionality to fetch web content with proper error handling.
 """
 
 import re
+import codecs
 import socket
-import requests
+from functools import lru_cache
 from pathlib import Path
+from urllib.parse import urlsplit
 
-# Set a timeout for DNS resolution to prevent hanging
-socket.setdefaulttimeout(3.0)
+# requests and urllib3 are imported where they are used, so starting the
+# browser does not wait for them
 
+# Local imports
+import app_confvars as confvars
+import dnscache
+import timing
+from httpcache import cache
+
+# Bytes read from the network per chunk when streaming a page
+STREAM_CHUNK_SIZE = 16384
+
+# Bytes inspected for a byte order mark or <meta charset> declaration
+SNIFF_LEN = 4096
+
+
+CHARSET_HEADER_RE = re.compile(r'charset\s*=\s*["\']?([-\w.:]+)', re.IGNORECASE)
+CHARSET_META_RE = re.compile(rb'<meta[^>]+?charset\s*=\s*["\']?\s*([-\w.:]+)', re.IGNORECASE)
+
+# Labels browsers decode with a different codec (WHATWG encoding standard)
+CHARSET_ALIASES = {
+    'iso-8859-1': 'cp1252',
+    'latin1': 'cp1252',
+    'us-ascii': 'cp1252',
+    'ascii': 'cp1252',
+}
+
+# Shared session, created on first use and closed by closeSession()
+_session = None
+
+class DownloadError(Exception):
+    """The connection failed while a streamed body was being read."""
+
+@lru_cache(maxsize=None)
+def acceptEncoding():
+    """Return the content codings urllib3 can decode here (br and zstd need brotli/zstandard)."""
+    import urllib3
+    return urllib3.util.make_headers(accept_encoding=True)["accept-encoding"]
+
+def getSession():
+    """Return the shared HTTP session, creating it on first use.
+    
+    The session keeps connections alive between requests and pools them
+    per host, so repeated requests to the same host skip the TCP connect
+    and TLS handshake.
+    
+    Returns:
+        requests.Session: Shared session instance
+    """
+    global _session
+    if _session is None:
+        import requests
+        from requests.adapters import HTTPAdapter
+        dnscache.install()  # Connections reuse the lookups made by getHost
+        _session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=confvars.pool_connections,
+            pool_maxsize=confvars.pool_maxsize
+        )
+        _session.mount("http://", adapter)
+        _session.mount("https://", adapter)
+    return _session
+
+def closeSession():
+    """Close the shared HTTP session and release all pooled connections."""
+    global _session
+    if _session is not None:
+        _session.close()
+        _session = None
+
+class URL:
+    """Components of a parsed http(s) URL."""
+    
+    __slots__ = ('scheme', 'host', 'port', 'path', 'query', 'fragment')
+    
+    def __init__(self, scheme, host, port, path, query, fragment):
+        self.scheme = scheme
+        self.host = host
+        self.port = port
+        self.path = path
+        self.query = query
+        self.fragment = fragment
+        
+    @property
+    def netloc(self):
+        """Host and explicit port, as sent in the Host header."""
+        host = f"[{self.host}]" if ':' in self.host else self.host
+        return f"{host}:{self.port}" if self.port is not None else host
+        
+    def __repr__(self):
+        return f"URL({self.scheme!r}, {self.host!r}, {self.port!r}, {self.path!r}, {self.query!r}, {self.fragment!r})"
+
+@lru_cache(maxsize=1024)
+def parseURL(url):
+    """Split an http(s) URL into its components.
+    
+    Handles ports, IPv6 literals, fragments and any case. Results are
+    memoized per URL string.
+    
+    Args:
+        url (str): URL to parse
+        
+    Returns:
+        URL: Parsed URL, or None if it is not a valid http(s) URL
+    """
+    try:
+        parts = urlsplit(url.strip())
+        port = parts.port
+    except ValueError:  # Malformed IPv6 literal or port
+        return None
+    if parts.scheme.lower() not in ('http', 'https') or not parts.hostname:
+        return None
+    return URL(parts.scheme.lower(), parts.hostname, port, parts.path or "/", parts.query, parts.fragment)
+
+@timing.timed("dns")
 def getHost(url):
-    """Extract and validate URL components using regex.
+    """Parse a URL and check that its host exists.
     
     Args:
         url (str): URL to parse
         
     Returns:
-        tuple: (scheme, host, path, query) or None if invalid URL
+        URL: Parsed URL, or None if the URL is invalid or the host doesn't resolve
     """
+    parsed = parseURL(url)
+    if parsed is None:
+        return None
     try:
-        scheme = re.search(r"\bhttps?://", url)
-        host = re.search(r"([-%@a-z0-9]+\.)+[-%@a-z0-9]+", url)
-        if not (scheme and host):
-            return None
-            
         # Quick DNS check - if it fails, the host doesn't exist
-        socket.gethostbyname(host.group())
-        
-        path = re.search(r"((?<=[-%@a-z0-9])/[-%@a-z0-9]+)+", url)
-        query = re.search(r"(\?[-%@a-z0-9]+=[-%@a-z0-9]+(&[-%@a-z0-9]+=[-%@a-z0-9]+)*)|(\?([-%@a-z0-9]+\+)*[-%@a-z0-9]+)", url)
-        return (scheme.group(), host.group(), path.group() if path else "/", query.group() if query else "")
-        
+        dnscache.resolver.resolve(parsed.host)
     except (socket.gaierror, socket.timeout):
         return None
+    return parsed
 
-def fetch(url, host, verify = True):
+@timing.timed("request")
+def fetch(url, host, verify = True, stream = False):
     """Fetch HTTP response from the given URL.
     
+    Fresh responses are served from the on-disk cache without touching the
+    network. Stale ones are revalidated with If-None-Match/If-Modified-Since,
+    and a 304 answer is served from the cache as well. Requests made with
+    verify=False bypass the cache, so a page fetched over an untrusted
+    connection is never served to a verified request.
+    
     Args:
         url (str): URL to fetch
-        host (str): Host extracted from the URL
+        host (URL or str): Parsed URL from getHost(), or the host name
         verify (bool): Verify SSL certificate (default: True)
+        stream (bool): Leave the body unread; the caller stores it in the
+            cache once it has been consumed (default: False)
         
     Returns:
         requests.Response or str: HTTP response object or "SSLERR" for SSL errors
     """
     headers = {
         "user-agent": "SPyB/24.01",
-        "host": host if isinstance(host, str) else host[1] if isinstance(host, tuple) else "",
-        "Cache-control": "max-age=180, public"
+        "host": host if isinstance(host, str) else host.netloc if isinstance(host, URL) else "",
+        "Cache-control": "max-age=180, public",
+        "Accept-Encoding": acceptEncoding()
     }
+    
+    entry = cache.lookup(url) if verify else None
+    if entry is not None:
+        if entry.isFresh():
+            response = entry.toResponse()
+            if response is not None:
+                cache.hit(entry)
+                return response
+        headers.update(entry.validators())
+        
+    import requests
     try:
-        return requests.get(url, headers=headers, verify=verify)
+        response = getSession().get(
+            url, headers=headers, verify=verify, stream=stream,
+            timeout=(confvars.connect_timeout, confvars.read_timeout)
+        )
     except requests.exceptions.SSLError:
         return "SSLERR"
     except requests.exceptions.RequestException:
         return None
+        
+    if response.status_code == 304 and entry is not None:
+        cache.refresh(entry, response.headers)
+        cached = entry.toResponse()
+        if cached is not None:
+            cache.hit(entry, revalidated=True)
+            return cached
+    if cache.enabled:
+        cache.miss()
+    response.verified = verify  # Checked by isCacheable()
+    if not stream:
+        cache.store(url, response)
+    return response
 
 def handleErrors(response):
     """Handle HTTP status codes and log accordingly.
@@ -77,8 +222,73 @@ def handleErrors(response):
     reason = response.reason
     return (status, reason)
 
+def _charsetName(label):
+    """Normalize a charset label to a Python codec name, or None if unknown."""
+    label = label.strip().lower()
+    label = CHARSET_ALIASES.get(label, label)
+    try:
+        return codecs.lookup(label).name
+    except LookupError:
+        return None
+
+def sniffCharset(head, contentType=None):
+    """Detect the character set of a body from its first bytes.
+    
+    Checks, in order: a byte order mark, the charset of the Content-Type
+    header, and a <meta charset> declaration. Without any of them the head
+    is tried as UTF-8, falling back to Windows-1252.
+    
+    Args:
+        head (bytes): First SNIFF_LEN bytes of the body
+        contentType (str, optional): Content-Type header value
+        
+    Returns:
+        str: Codec name for decoding the whole body
+    """
+    if head.startswith(codecs.BOM_UTF8):
+        return 'utf-8-sig'
+    if head.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+        return 'utf-16'
+        
+    match = CHARSET_HEADER_RE.search(contentType or "")
+    charset = match and _charsetName(match.group(1))
+    if charset:
+        return charset
+        
+    match = CHARSET_META_RE.search(head)
+    charset = match and _charsetName(match.group(1).decode('ascii', errors='ignore'))
+    if charset:
+        # A document read as bytes can't really be UTF-16 if the meta tag was ASCII
+        return 'utf-8' if charset.startswith('utf-16') else charset
+        
+    try:
+        head.decode('utf-8')
+    except UnicodeDecodeError as e:
+        if e.start < len(head) - 3:  # Not just a character cut off at the end
+            return 'cp1252'
+    return 'utf-8'
+
+def readPreview(response, previewLen):
+    """Read at most previewLen body bytes without loading the rest.
+    
+    Args:
+        response (requests.Response): Response, preferably opened with stream=True
+        previewLen (int): Number of bytes to read
+        
+    Returns:
+        bytes: Start of the body
+    """
+    import requests
+    try:
+        body = next(response.iter_content(previewLen), b'')
+    except requests.exceptions.RequestException:
+        body = b''
+    finally:
+        response.close()
+    return body[:previewLen]
+
 def decodeBody(response, previewLen=None):
-    """Decode HTTP response body using the specified character set.
+    """Decode HTTP response body in a single pass.
     
     Args:
         response (requests.Response): HTTP response object
@@ -90,29 +300,157 @@ def decodeBody(response, previewLen=None):
     if response == "SSLERR" or response is None:
         return ""
         
-    body = response.content if previewLen is None else response.content[:previewLen]
-    charset = response.encoding or 'utf-8'
+    with timing.span("download"):
+        body = response.content if previewLen is None else readPreview(response, previewLen)
+    with timing.span("decode"):
+        charset = sniffCharset(body[:SNIFF_LEN], response.headers.get('Content-Type'))
+        return body.decode(charset, errors='replace')
+
+def iterBody(url, response, progress=None):
+    """Yield the decoded body of a streamed response as it arrives.
+    
+    The first SNIFF_LEN bytes are buffered to detect the character set, then
+    the body is decoded incrementally, so multi-byte characters split across
+    chunks are handled. Once fully read it is stored in the response cache.
     
+    Args:
+        url (str): Requested URL
+        response (requests.Response): Response opened with stream=True
+        progress (callable, optional): Called with the size of every raw chunk
+        
+    Yields:
+        str: Decoded text chunks
+        
+    Raises:
+        DownloadError: If the connection fails before the body is complete
+    """
+    import requests
+    decoder = None
+    raw = []
+    size = 0
     try:
-        return body.decode(charset)
-    except UnicodeDecodeError:
-        return body.decode('ISO-8859-1', errors='replace')
+        for chunk in timing.timedIter(response.iter_content(STREAM_CHUNK_SIZE), "download"):
+            raw.append(chunk)
+            size += len(chunk)
+            if progress is not None:
+                progress(len(chunk))
+            if decoder is None:
+                if size < SNIFF_LEN:
+                    continue
+                head = b''.join(raw)
+                charset = sniffCharset(head[:SNIFF_LEN], response.headers.get('Content-Type'))
+                decoder = codecs.getincrementaldecoder(charset)(errors='replace')
+                chunk = head
+            with timing.span("decode"):
+                text = decoder.decode(chunk)
+            if text:
+                yield text
+        if decoder is None:  # Body shorter than SNIFF_LEN
+            head = b''.join(raw)
+            charset = sniffCharset(head, response.headers.get('Content-Type'))
+            decoder = codecs.getincrementaldecoder(charset)(errors='replace')
+            text = decoder.decode(head)
+        else:
+            text = ''
+        text += decoder.decode(b'', final=True)
+        if text:
+            yield text
+        response._content = b''.join(raw)
+        cache.store(url, response)
+    except requests.exceptions.RequestException as e:
+        raise DownloadError(str(e)) from e
+    finally:
+        response.close()
 
-def fetcher(url, verify=True):
+def streamer(url, verify=True, progress=None):
+    """Fetch a page for incremental display.
+    
+    Works like fetcher(), except that a successful network response is
+    returned as an iterator of decoded text chunks instead of a string.
+    
+    Args:
+        url (str): URL to fetch
+        verify (bool): Verify SSL certificate (default: True)
+        progress (callable, optional): Called with the size of every raw chunk
+        
+    Returns:
+        iterator, str or tuple: Body chunks, cached body, or error value as in fetcher()
+    """
+    host = getHost(url)
+    if host is None:
+        return None
+        
+    response = fetch(url, host, verify, stream=True)
+    if response == "SSLERR":
+        return "SSLERR"
+    elif response is None:
+        return None
+        
+    status, reason = handleErrors(response)
+    if status != 200:
+        return ("ERROR", status, reason, decodeBody(response, 1000))
+    if getattr(response, "from_cache", False):
+        return decodeBody(response)
+        
+    return iterBody(url, response, progress)
+
+def readLimited(response, max_bytes):
+    """Read a streamed body unless it is larger than max_bytes.
+    
+    The Content-Length header is checked before anything is read, and the
+    read stops as soon as the body grows past the limit.
+    
+    Args:
+        response (requests.Response): Response opened with stream=True
+        max_bytes (int): Largest body accepted
+        
+    Returns:
+        bool: True if the body was read into response.content
+    """
+    if getattr(response, "from_cache", False):
+        return len(response.content) <= max_bytes
+    import requests
+    try:
+        if int(response.headers.get("Content-Length", 0)) > max_bytes:
+            return False
+    except ValueError:
+        pass
+    chunks = []
+    size = 0
+    try:
+        for chunk in response.iter_content(STREAM_CHUNK_SIZE):
+            size += len(chunk)
+            if size > max_bytes:
+                return False
+            chunks.append(chunk)
+    except requests.exceptions.RequestException:
+        return False
+    finally:
+        response.close()
+    response._content = b''.join(chunks)
+    return True
+
+def fetcher(url, verify=True, progress=None, on_headers=None, max_bytes=None):
     """Fetch and handle HTTP response from the given URL.
     
     Args:
         url (str): URL to fetch
         verify (bool): Verify SSL certificate (default: True)
+        progress (callable, optional): Called with the body size once received
+        on_headers (callable, optional): Called with the headers of a successful
+            response before its body is read; returning False skips the body
+        max_bytes (int, optional): Skip bodies larger than this, without
+            reading more of them than that
         
     Returns:
-        str or tuple: Decoded response body or error tuple
+        str or tuple: Decoded response body or error tuple; None if the body
+            was skipped
     """
     host = getHost(url)
     if host is None:
         return None
         
-    response = fetch(url, host, verify)
+    response = fetch(url, host, verify, stream=True)
     if response == "SSLERR":
         return "SSLERR"
     elif response is None:
@@ -122,4 +460,16 @@ def fetcher(url, verify=True):
     if status != 200:
         return ("ERROR", status, reason, decodeBody(response, 1000))
         
-    return decodeBody(response)  # Return full content
\ No newline at end of file
+    if on_headers is not None and on_headers(response.headers) is False:
+        response.close()
+        return None
+    with timing.span("download"):
+        if max_bytes is not None and not readLimited(response, max_bytes):
+            response.close()
+            return None
+        size = len(response.content)
+    if progress is not None:
+        progress(size)
+    if not getattr(response, "from_cache", False):
+        cache.store(url, response)
+    return decodeBody(response)  # Return full content
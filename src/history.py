@@ -0,0 +1,168 @@
+"""
+Browsing history module for SPyB.
+Keeps a back/forward stack of visited pages with compact snapshots of their
+rendered content, so going back restores a page without fetching it again.
+"""
+
+# Standard library imports
+import sys
+import threading
+
+# Local imports
+import app_confvars as confvars
+from linestore import LineStore
+
+class Snapshot:
+    """Compact copy of a rendered page.
+
+    The lines are kept in a LineStore, which costs far less memory than a
+    list of separate line objects. A page's store is never modified once
+    it is complete, so it is shared rather than copied.
+    """
+
+    __slots__ = ('lines', 'links', 'size')
+
+    def __init__(self, content_lines, link_positions):
+        self.lines = content_lines if isinstance(content_lines, LineStore) else LineStore(content_lines)
+        self.links = tuple(link_positions.items())
+        self.size = sys.getsizeof(self.lines) + sum(
+            sys.getsizeof(spans) + sum(sys.getsizeof(link) + len(link.href) for link in spans)
+            for _, spans in self.links
+        )
+
+    def restore(self):
+        """Rebuild the page tables.
+
+        Returns:
+            tuple: (content_lines, links, link_positions)
+        """
+        link_positions = dict(self.links)
+        links = [link for _, spans in self.links for link in spans]
+        return (self.lines, links, link_positions)
+
+class HistoryEntry:
+    """A visited page: its URL, view position and optional snapshot.
+
+    The position is counted in lines of the page, not in screen rows, so it
+    still holds after the terminal was resized.
+    """
+
+    __slots__ = ('url', 'scroll_pos', 'cursor_y', 'snapshot')
+
+    def __init__(self, url, snapshot=None):
+        self.url = url
+        self.scroll_pos = 0
+        self.cursor_y = 0
+        self.snapshot = snapshot
+
+class History:
+    """Back/forward stack with a memory cap on the stored snapshots.
+
+    When the snapshots exceed ``max_bytes`` the oldest ones are dropped;
+    their entries stay in the stack and are fetched again when revisited.
+    """
+
+    def __init__(self, max_bytes=None):
+        self.max_bytes = confvars.history_max_bytes if max_bytes is None else max_bytes
+        self.entries = []
+        self.index = -1
+        self.total_bytes = 0
+        self.lock = threading.Lock()  # Snapshots of lazily parsed pages are refreshed by the parse thread
+
+    @property
+    def current(self):
+        return self.entries[self.index] if self.index >= 0 else None
+
+    def visit(self, url, content_lines, link_positions):
+        """Record a newly displayed page, discarding the forward entries.
+
+        Args:
+            url (str): Page URL
+            content_lines (LineStore): Rendered lines
+            link_positions (dict): Line number -> tuple of Links
+        """
+        with self.lock:
+            for entry in self.entries[self.index + 1:]:
+                self._drop(entry)
+            del self.entries[self.index + 1:]
+            self.entries.append(HistoryEntry(url))
+            self.index = len(self.entries) - 1
+            self._store(self.current, content_lines, link_positions)
+
+    def store(self, content_lines, link_positions):
+        """Replace the snapshot of the current entry."""
+        with self.lock:
+            if self.current is not None:
+                self._store(self.current, content_lines, link_positions)
+
+    def refresh(self, content_lines, link_positions):
+        """Snapshot a page again once it is complete.
+
+        A lazily parsed page is recorded after its first screenful, so its
+        snapshot misses the links found later. Every entry whose snapshot
+        shares the page's lines gets a new one; entries whose snapshot was
+        evicted in the meantime stay without.
+        """
+        with self.lock:
+            for entry in self.entries:
+                if entry.snapshot is not None and entry.snapshot.lines is content_lines:
+                    self._store(entry, content_lines, link_positions)
+
+    def _store(self, entry, content_lines, link_positions):
+        self._drop(entry)
+        if self.max_bytes <= 0:
+            return
+        entry.snapshot = Snapshot(content_lines, link_positions)
+        self.total_bytes += entry.snapshot.size
+        self._evict()
+
+    def savePosition(self, scroll_pos, cursor_y):
+        """Remember where the current page was scrolled to.
+
+        Args:
+            scroll_pos (int): Line at the top of the screen
+            cursor_y (int): Line of the cursor, counted from the top line
+        """
+        entry = self.current
+        if entry is not None:
+            entry.scroll_pos = scroll_pos
+            entry.cursor_y = cursor_y
+
+    def replace(self, entries, index):
+        """Take over the entries of a restored session.
+
+        Args:
+            entries (list): HistoryEntry objects, oldest first
+            index (int): Position of the current entry
+        """
+        with self.lock:
+            self.entries = entries
+            self.index = index if entries else -1
+            self.total_bytes = sum(entry.snapshot.size for entry in entries if entry.snapshot is not None)
+            self._evict()
+
+    def back(self):
+        """Move one entry back. Returns the entry, or None at the start."""
+        if self.index <= 0:
+            return None
+        self.index -= 1
+        return self.entries[self.index]
+
+    def forward(self):
+        """Move one entry forward. Returns the entry, or None at the end."""
+        if self.index >= len(self.entries) - 1:
+            return None
+        self.index += 1
+        return self.entries[self.index]
+
+    def _drop(self, entry):
+        if entry.snapshot is not None:
+            self.total_bytes -= entry.snapshot.size
+            entry.snapshot = None
+
+    def _evict(self):
+        """Drop the oldest snapshots until the total fits the cap."""
+        for entry in self.entries:
+            if self.total_bytes <= self.max_bytes:
+                break
+            self._drop(entry)
@@ -0,0 +1,338 @@
+"""
+HTTP response cache module for SPyB.
+Stores response bodies on disk keyed by URL and decides when they can be
+reused, following the Cache-Control, Expires, ETag and Last-Modified headers.
+"""
+
+# Standard library imports
+import json
+import os
+import time
+import hashlib
+import functools
+import threading
+from collections import OrderedDict
+from email.utils import parsedate_to_datetime
+from pathlib import Path
+
+# Local imports
+import app_confvars as confvars
+
+cache_path = (Path(__file__).parent / "../etc/cache").resolve()
+
+def _synchronized(method):
+    """Run a ResponseCache method while holding the cache lock.
+
+    The index is read from disk before the first method runs.
+    """
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self.lock:
+            if not self.loaded:
+                self.loaded = True
+                if self.enabled:
+                    self._loadIndex()
+            return method(self, *args, **kwargs)
+    return wrapper
+
+def _parseDate(value):
+    """Parse an HTTP date header into a UNIX timestamp, or None."""
+    if not value:
+        return None
+    try:
+        return parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError, IndexError):
+        return None
+
+def parseCacheControl(value):
+    """Parse a Cache-Control header into a dict of directives.
+
+    Args:
+        value (str): Header value, e.g. "public, max-age=300"
+
+    Returns:
+        dict: Lowercase directive names mapped to their value (or True)
+    """
+    directives = {}
+    for part in (value or "").split(","):
+        name, _, arg = part.strip().partition("=")
+        if name:
+            directives[name.lower()] = arg.strip('"') if arg else True
+    return directives
+
+def freshnessLifetime(headers, stored_at):
+    """Compute how long a response stays fresh, in seconds.
+
+    Args:
+        headers (Mapping): Response headers
+        stored_at (float): Time the response was received
+
+    Returns:
+        float: Freshness lifetime (0 means revalidate before every use)
+    """
+    cc = parseCacheControl(headers.get("Cache-Control"))
+    if "no-cache" in cc:
+        return 0
+    for directive in ("s-maxage", "max-age"):
+        if directive in cc:
+            try:
+                return max(0, int(cc[directive]))
+            except ValueError:
+                return 0
+    date = _parseDate(headers.get("Date")) or stored_at
+    expires = _parseDate(headers.get("Expires"))
+    if expires is not None:
+        return max(0, expires - date)
+    # Heuristic freshness: 10% of the time since the last modification
+    last_modified = _parseDate(headers.get("Last-Modified"))
+    if last_modified is not None:
+        return max(0, (date - last_modified) / 10)
+    return 0
+
+def isCacheable(response):
+    """Check whether a response may be stored in the cache."""
+    if response.status_code != 200:
+        return False
+    if not getattr(response, "verified", True):  # Fetched without checking the certificate
+        return False
+    cc = parseCacheControl(response.headers.get("Cache-Control"))
+    if "no-store" in cc or "private" in cc:
+        return False
+    return True
+
+class CacheEntry:
+    """A cached response: its metadata and the path of its body on disk."""
+
+    def __init__(self, key, meta, body_path):
+        self.key = key
+        self.meta = meta
+        self.body_path = body_path
+
+    @property
+    def size(self):
+        return self.meta.get("size", 0)
+
+    def isFresh(self, now=None):
+        """Check whether the entry can be used without revalidation."""
+        now = time.time() if now is None else now
+        return now - self.meta["stored_at"] < self.meta["lifetime"]
+
+    def validators(self):
+        """Return the conditional request headers for revalidation."""
+        headers = {}
+        if self.meta.get("etag"):
+            headers["If-None-Match"] = self.meta["etag"]
+        if self.meta.get("last_modified"):
+            headers["If-Modified-Since"] = self.meta["last_modified"]
+        return headers
+
+    def toResponse(self):
+        """Build a requests.Response holding the cached body.
+
+        Returns:
+            requests.Response: Response usable by handleErrors/decodeBody,
+                or None if the body file has gone missing
+        """
+        try:
+            body = self.body_path.read_bytes()
+        except OSError:
+            return None
+        import requests  # Only needed once a page is loaded
+        response = requests.Response()
+        response._content = body
+        response._content_consumed = True
+        response.status_code = 200
+        response.reason = "OK"
+        response.url = self.meta["url"]
+        response.encoding = self.meta.get("encoding")
+        response.headers.update(self.meta.get("headers", {}))
+        response.from_cache = True
+        return response
+
+class ResponseCache:
+    """Size-bounded on-disk response cache with LRU eviction.
+
+    Each entry is a pair of files named after the SHA-1 of the URL:
+    ``<key>.body`` holds the raw response bytes and ``<key>.json`` the
+    metadata. The modification time of the metadata file records the last
+    use, so the LRU order survives a restart.
+    """
+
+    # Response headers worth keeping with the body
+    KEPT_HEADERS = ("Content-Type", "Cache-Control", "Expires", "Date",
+                    "ETag", "Last-Modified")
+
+    def __init__(self, path=cache_path, max_size=None):
+        self.path = Path(path)
+        self.max_size = confvars.max_cache_size if max_size is None else max_size
+        self.entries = OrderedDict()  # key -> size, least recently used first
+        self.total_size = 0
+        self.lock = threading.RLock()  # Shared by the page loader and prefetch workers
+        self.stats = {
+            "hits": 0,
+            "misses": 0,
+            "revalidated": 0,
+            "stored": 0,
+            "evicted": 0,
+            "bytes_served": 0,
+            "bytes_stored": 0
+        }
+        self.loaded = False  # Index read on first use, not at startup
+
+    @property
+    def enabled(self):
+        return self.max_size > 0
+
+    @staticmethod
+    def keyFor(url):
+        return hashlib.sha1(url.encode("utf-8")).hexdigest()
+
+    def _paths(self, key):
+        return self.path / f"{key}.json", self.path / f"{key}.body"
+
+    def _loadIndex(self):
+        """Rebuild the in-memory LRU index from the cache directory."""
+        try:
+            self.path.mkdir(parents=True, exist_ok=True)
+            metas = sorted(self.path.glob("*.json"), key=lambda p: p.stat().st_mtime)
+        except OSError:
+            self.max_size = 0
+            return
+        for meta_path in metas:
+            key = meta_path.stem
+            try:
+                meta = json.loads(meta_path.read_text())
+            except (OSError, ValueError):
+                self._remove(key)
+                continue
+            self.entries[key] = meta.get("size", 0)
+            self.total_size += self.entries[key]
+        self._evict()
+
+    def _remove(self, key):
+        """Delete an entry's files and drop it from the index."""
+        self.total_size -= self.entries.pop(key, 0)
+        for path in self._paths(key):
+            try:
+                path.unlink()
+            except OSError:
+                pass
+
+    def _evict(self):
+        """Drop least recently used entries until the cache fits its cap."""
+        while self.entries and self.total_size > self.max_size:
+            key = next(iter(self.entries))
+            self._remove(key)
+            self.stats["evicted"] += 1
+
+    @_synchronized
+    def lookup(self, url):
+        """Find the cached entry for a URL.
+
+        Args:
+            url (str): Requested URL
+
+        Returns:
+            CacheEntry or None: Entry (fresh or stale) or None if not cached
+        """
+        if not self.enabled:
+            return None
+        key = self.keyFor(url)
+        if key not in self.entries:
+            return None
+        meta_path, body_path = self._paths(key)
+        try:
+            meta = json.loads(meta_path.read_text())
+            os.utime(meta_path)
+        except (OSError, ValueError):
+            self._remove(key)
+            return None
+        if meta.get("url") != url:
+            return None
+        self.entries.move_to_end(key)
+        return CacheEntry(key, meta, body_path)
+
+    @_synchronized
+    def hit(self, entry, revalidated=False):
+        """Record that a cached entry was served."""
+        self.stats["hits"] += 1
+        self.stats["bytes_served"] += entry.size
+        if revalidated:
+            self.stats["revalidated"] += 1
+
+    @_synchronized
+    def miss(self):
+        """Record that a request had to be answered by the network."""
+        self.stats["misses"] += 1
+
+    @_synchronized
+    def store(self, url, response):
+        """Store a response body and its metadata.
+
+        Args:
+            url (str): Requested URL
+            response (requests.Response): Response to store
+        """
+        if not self.enabled or not isCacheable(response):
+            return
+        body = response.content
+        if len(body) > self.max_size:
+            return
+        key = self.keyFor(url)
+        now = time.time()
+        headers = {name: response.headers[name] for name in self.KEPT_HEADERS
+                   if name in response.headers}
+        meta = {
+            "url": url,
+            "stored_at": now,
+            "lifetime": freshnessLifetime(response.headers, now),
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+            "encoding": response.encoding,
+            "headers": headers,
+            "size": len(body)
+        }
+        meta_path, body_path = self._paths(key)
+        self._remove(key)
+        try:
+            body_path.write_bytes(body)
+            meta_path.write_text(json.dumps(meta))
+        except OSError:
+            self._remove(key)
+            return
+        self.entries[key] = len(body)
+        self.total_size += len(body)
+        self.stats["stored"] += 1
+        self.stats["bytes_stored"] += len(body)
+        self._evict()
+
+    @_synchronized
+    def refresh(self, entry, headers):
+        """Update a stale entry after a 304 Not Modified response.
+
+        Args:
+            entry (CacheEntry): Entry that was revalidated
+            headers (Mapping): Headers of the 304 response
+        """
+        now = time.time()
+        merged = dict(entry.meta.get("headers", {}))
+        merged.update({name: headers[name] for name in self.KEPT_HEADERS if name in headers})
+        entry.meta["headers"] = merged
+        entry.meta["stored_at"] = now
+        entry.meta["lifetime"] = freshnessLifetime(merged, now)
+        entry.meta["etag"] = merged.get("ETag", entry.meta.get("etag"))
+        entry.meta["last_modified"] = merged.get("Last-Modified", entry.meta.get("last_modified"))
+        meta_path, _ = self._paths(entry.key)
+        try:
+            meta_path.write_text(json.dumps(entry.meta))
+        except OSError:
+            self._remove(entry.key)
+
+    @_synchronized
+    def clear(self):
+        """Remove every cached entry."""
+        for key in list(self.entries):
+            self._remove(key)
+
+# Shared cache instance
+cache = ResponseCache()
@@ -0,0 +1,86 @@
+"""
+Lazy page parsing module for SPyB.
+Parses long documents a block at a time as they are scrolled into view, so
+the first screenful is shown without waiting for the whole page.
+"""
+
+# Standard library imports
+import threading
+
+# Local imports
+import parser
+from linestore import LineStore
+
+class LazyPage:
+    """A page whose lines are parsed on demand.
+
+    The HTML is cut into blocks of about BLOCK_SIZE characters, each ending
+    just before a tag, and fed to a LineStream when more lines are needed.
+    ``content_lines``, ``links`` and ``link_positions`` only ever grow, so
+    they can be displayed while a background thread parses the rest.
+    """
+
+    # Characters parsed per step
+    BLOCK_SIZE = 8192
+
+    def __init__(self, html, base_url=None, on_done=None):
+        self.html = html
+        self.pos = 0
+        self.stream = parser.LineStream(base_url=base_url)
+        self.content_lines = LineStore()
+        self.links = []
+        self.link_positions = {}
+        self.on_done = on_done
+        self.done = False
+        self.lock = threading.Lock()
+        self.thread = None
+
+    def ensure(self, count):
+        """Parse until at least ``count`` lines exist or the page is complete."""
+        with self.lock:
+            while not self.done and len(self.content_lines) < count:
+                self._step()
+
+    def finish(self):
+        """Parse the rest of the page."""
+        with self.lock:
+            while not self.done:
+                self._step()
+
+    def start(self):
+        """Parse the rest of the page in a background thread."""
+        if self.thread is None and not self.done:
+            self.thread = threading.Thread(target=self._fill, name="spyb-parse", daemon=True)
+            self.thread.start()
+
+    def _fill(self):
+        while True:
+            with self.lock:  # Released between blocks so ensure() is never kept waiting long
+                if self.done:
+                    return
+                self._step()
+
+    def _step(self):
+        """Parse the next block. Must be called with the lock held."""
+        if self.pos < len(self.html):
+            end = self.html.find('<', self.pos + self.BLOCK_SIZE)
+            if end == -1:
+                end = len(self.html)
+            lines = self.stream.feed(self.html[self.pos:end])
+            self.pos = end
+        else:
+            lines = self.stream.close()
+            self.done = True
+
+        first = len(self.content_lines)
+        for i, line in enumerate(lines, first):
+            # Links first: a line becomes visible once its text is appended
+            if line.links:
+                self.links.extend(line.links)
+                self.link_positions[i] = tuple(line.links)
+            self.content_lines.append(line.text)
+
+        if self.done:
+            self.html = self.stream = None
+            if self.on_done is not None:
+                self.on_done(self)
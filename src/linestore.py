@@ -0,0 +1,93 @@
+"""
+Line storage module for SPyB.
+Stores the lines of a page in one UTF-8 buffer instead of a list of string
+objects, which keeps huge pages small in memory.
+"""
+
+# Standard library imports
+from array import array
+
+class LineStore:
+    """Compact, append-only sequence of text lines.
+
+    All lines live in a single UTF-8 ``bytearray``; ``offsets[i]`` is where
+    line ``i`` starts and ``offsets[i + 1]`` where it ends. A line is only
+    decoded into a ``str`` when it is accessed, which is O(1) for any index.
+    """
+
+    __slots__ = ('buffer', 'offsets')
+
+    # Lines decoded together while iterating
+    BLOCK_LINES = 1024
+
+    def __init__(self, lines=()):
+        self.buffer = bytearray()
+        self.offsets = array('I', [0])
+        self.extend(lines)
+
+    @classmethod
+    def from_buffer(cls, buffer, offsets):
+        """Make a store over existing line data without copying it.
+
+        Such a store is read-only: used for pages mapped from the session file.
+
+        Args:
+            buffer: Bytes-like object whose slices are bytes, e.g. an mmap
+            offsets: Sequence of line starts plus the end, e.g. a memoryview cast to 'I'
+
+        Returns:
+            LineStore: Store reading its lines from ``buffer``
+        """
+        store = cls.__new__(cls)
+        store.buffer = buffer
+        store.offsets = offsets
+        return store
+
+    def append(self, line):
+        """Add a line at the end."""
+        self.buffer += line.encode('utf-8', 'surrogatepass')
+        self.offsets.append(len(self.buffer))
+
+    def extend(self, lines):
+        """Add several lines at the end."""
+        buffer = self.buffer
+        offsets = self.offsets
+        for line in lines:
+            buffer += line.encode('utf-8', 'surrogatepass')
+            offsets.append(len(buffer))
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        offsets = self.offsets
+        count = len(offsets) - 1
+        if index < 0:
+            index += count
+        if not 0 <= index < count:
+            raise IndexError("line index out of range")
+        return self.buffer[offsets[index]:offsets[index + 1]].decode('utf-8', 'surrogatepass')
+
+    def __iter__(self):
+        buffer = self.buffer
+        offsets = self.offsets
+        count = len(self)
+        for first in range(0, count, self.BLOCK_LINES):
+            last = min(first + self.BLOCK_LINES, count)
+            base = offsets[first]
+            block = buffer[base:offsets[last]].decode('utf-8', 'surrogatepass')
+            if len(block) == offsets[last] - base:
+                # Pure ASCII: character offsets equal byte offsets
+                for i in range(first, last):
+                    yield block[offsets[i] - base:offsets[i + 1] - base]
+            else:
+                for i in range(first, last):
+                    yield buffer[offsets[i]:offsets[i + 1]].decode('utf-8', 'surrogatepass')
+
+    def __sizeof__(self):
+        return object.__sizeof__(self) + self.buffer.__sizeof__() + self.offsets.__sizeof__()
+
+    def __repr__(self):
+        return f"<LineStore of {len(self)} lines, {len(self.buffer)} bytes>"
@@ -0,0 +1,96 @@
+"""
+Background page loading module for SPyB.
+Runs fetches in a worker thread so the TUI can keep handling input and
+showing progress while a page is downloading.
+"""
+
+# Standard library imports
+import queue
+import threading
+
+class PageLoad:
+    """A fetch running in a background thread.
+
+    The worker calls ``fetch(url, verify=verify, progress=...)``. A plain
+    result (string, error tuple or None) is delivered once via ``result()``.
+    A streamed result (an iterator of text chunks) is forwarded chunk by
+    chunk and read on the UI thread through ``chunks()``.
+    """
+
+    # Seconds the UI thread waits for news from the worker before polling input
+    POLL_INTERVAL = 0.05
+
+    def __init__(self, fetch, url, verify=True):
+        self.url = url
+        self.bytes_received = 0
+        self.cancelled = threading.Event()
+        self.queue = queue.Queue()
+        self.thread = threading.Thread(
+            target=self._run, args=(fetch, url, verify),
+            name="spyb-fetch", daemon=True
+        )
+        self.thread.start()
+
+    def _progress(self, nbytes):
+        self.bytes_received += nbytes
+
+    def _run(self, fetch, url, verify):
+        """Worker thread: fetch the page and forward the result."""
+        try:
+            result = fetch(url, verify=verify, progress=self._progress)
+        except Exception as e:  # Never let the worker die silently
+            self.queue.put(("done", None, e))
+            return
+        if isinstance(result, (str, tuple)) or result is None:
+            self.queue.put(("done", result, None))
+            return
+        self.queue.put(("stream", None, None))
+        try:
+            for text in result:
+                if self.cancelled.is_set():
+                    break
+                self.queue.put(("chunk", text, None))
+        except Exception as e:  # The download broke off; chunks() raises it
+            self.queue.put(("error", None, e))
+        finally:
+            result.close()
+            self.queue.put(("end", None, None))
+
+    def cancel(self):
+        """Ask the worker to stop; its result will be discarded."""
+        self.cancelled.set()
+
+    def poll(self):
+        """Wait briefly for the first message from the worker.
+
+        Returns:
+            tuple or None: ("done", result, error) or ("stream", None, None),
+                or None if nothing arrived yet
+        """
+        try:
+            return self.queue.get(timeout=self.POLL_INTERVAL)
+        except queue.Empty:
+            return None
+
+    def chunks(self):
+        """Yield streamed text chunks on the UI thread.
+
+        Yields an empty string whenever no chunk arrived within
+        POLL_INTERVAL, so the consumer can handle input while waiting.
+        Closing the generator cancels the download. An error that broke
+        off the download is raised here.
+        """
+        try:
+            while True:
+                try:
+                    kind, text, error = self.queue.get(timeout=self.POLL_INTERVAL)
+                except queue.Empty:
+                    yield ""
+                    continue
+                if kind == "end":
+                    return
+                if kind == "error":
+                    raise error
+                yield text
+        finally:
+            self.cancel()
@@ -4,13 +4,12 @@ Sets up colored logging with both file and terminal output.
 """
 
 # Standard library imports
+import queue
+import atexit
 import logging
 import logging.handlers
 from pathlib import Path
 
-# Third-party imports
-from colorama import Fore, Style
-
 # Local imports
 import app_confvars as confvars
 
@@ -21,26 +20,45 @@ def init():
     - StreamHandler for terminal output with color formatting
     - RotatingFileHandler for file output
     
+    Both run in a background QueueListener thread. The logger itself only
+    puts records on a queue, so a log call never waits for the terminal or
+    for file I/O and rotation.
+    
     Returns:
         logging.Logger: Configured logger instance
     """
+    global listener
+    
     class ColoredFormatter(logging.Formatter):
-        """Custom formatter that adds color to terminal output based on log level."""
+        """Custom formatter that adds color to terminal output based on log level.
         
-        format = "%(asctime)s - %(levelname)s - %(message)s"
+        The per-level formatters are built by the first record formatted, so
+        colorama is imported by the listener thread instead of at startup.
+        """
         
-        FORMATS = {
-            logging.DEBUG: format,
-            logging.INFO: format,
-            logging.WARNING: Fore.YELLOW + format + Fore.RESET,
-            logging.ERROR: Fore.RED + format + Fore.RESET,
-            logging.CRITICAL: Fore.RED + Style.BRIGHT + format + Fore.RESET + Style.RESET_ALL
-        }
+        FORMAT = "%(asctime)s - %(levelname)s - %(message)s"
         
+        formatters = None  # Level -> Formatter, built once
+        
+        def build_formatters(self):
+            from colorama import Fore, Style
+            fmt = self.FORMAT
+            formats = {
+                logging.DEBUG: fmt,
+                logging.INFO: fmt,
+                logging.WARNING: Fore.YELLOW + fmt + Fore.RESET,
+                logging.ERROR: Fore.RED + fmt + Fore.RESET,
+                logging.CRITICAL: Fore.RED + Style.BRIGHT + fmt + Fore.RESET + Style.RESET_ALL
+            }
+            return {level: logging.Formatter(log_fmt) for level, log_fmt in formats.items()}
+            
         def format(self, record):
             """Format log record with appropriate color."""
-            log_fmt = self.FORMATS.get(record.levelno)
-            formatter = logging.Formatter(log_fmt)
+            if self.formatters is None:
+                self.formatters = self.build_formatters()
+            formatter = self.formatters.get(record.levelno)
+            if formatter is None:  # Custom level
+                formatter = self.formatters[logging.INFO]
             return formatter.format(record)
             
     # Setup paths and configuration
@@ -51,7 +69,7 @@ def init():
     max_log_size = confvars.max_log_size
     max_log_backups = confvars.max_log_backups
     
-    # Initialize logger
+    # Initialize logger. Calls below its level return before building a record
     logger = logging.getLogger('spyb')
     if not logger.handlers:  # Only add handlers if they don't exist
         logger.setLevel(min(log_level_tty, log_level_file))
@@ -60,7 +78,6 @@ def init():
         tty_handler = logging.StreamHandler()
         tty_handler.setLevel(log_level_tty)
         tty_handler.setFormatter(ColoredFormatter())
-        logger.addHandler(tty_handler)
         
         # File handler with rotation
         file_handler = logging.handlers.RotatingFileHandler(
@@ -70,9 +87,27 @@ def init():
         )
         file_handler.setLevel(log_level_file)
         file_handler.setFormatter(logging.Formatter("%(asctime)s - %(filename)s - %(lineno)d - %(levelname)s - %(message)s"))
-        logger.addHandler(file_handler)
+        
+        # The handlers are fed from a queue by a background thread
+        log_queue = queue.SimpleQueue()
+        listener = logging.handlers.QueueListener(
+            log_queue, tty_handler, file_handler, respect_handler_level=True
+        )
+        listener.start()
+        atexit.register(stop)
+        logger.addHandler(logging.handlers.QueueHandler(log_queue))
     
     return logger
 
+def stop():
+    """Write out the queued records and stop the listener thread."""
+    global listener
+    if listener is not None:
+        listener.stop()
+        listener = None
+
+# Background thread writing the queued records, None once stopped
+listener = None
+
 # Get or create logger instance
 logger = init()
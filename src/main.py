@@ -5,7 +5,6 @@ Initializes and runs the text-based browser interface.
 
 import app_confvars as confvars
 import tui
-import durak
 
 def main():
     # Initialize browser with configured control style
@@ -14,7 +13,13 @@ def main():
 
     try:
         url = None
-        while True:
+        if interface.restore_session():
+            # The last session's page is back on screen without loading it
+            while interface.handle_input():
+                if interface.should_quit:
+                    break
+            url = interface.current_url
+        while not interface.should_quit:
             # Get initial or new URL
             if not url:
                 url = interface.get_url()
@@ -23,17 +28,25 @@ def main():
                     
             # Fetch and display content
             content = interface.fetch_url(url)
+            if content == "NAVIGATE" and not interface.should_quit:
+                url = interface.current_url  # Another page requested while loading
+                continue
             if content is None or interface.should_quit:
                 url = None  # Reset URL on fetch failure
                 if interface.should_quit:
                     break
                 continue
                 
-            result = interface.display_html(content)
-            if result == "RETRY" or interface.should_quit:
-                if interface.should_quit:
-                    break
-                continue
+            if content != "CANCELLED":  # A cancelled load keeps the current page
+                result = interface.display_html(content)
+                if result == "NAVIGATE" and not interface.should_quit:
+                    url = interface.current_url  # Page left while still loading
+                    continue
+                if result == "RETRY" or interface.should_quit:
+                    if interface.should_quit:
+                        break
+                    continue
+                interface.finish_timing()
                 
             # Handle user input until URL change is requested
             while interface.handle_input():
@@ -49,7 +62,9 @@ def main():
     finally:
         start_durak = interface.should_start_durak  # Store this before cleanup
         tui.cleanup()
+        interface.save_session()
         if start_durak:  # Start durak after cleanup if triggered
+            import durak
             durak.durak()
 
 if __name__ == "__main__":
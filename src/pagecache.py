@@ -0,0 +1,120 @@
+"""
+Parsed page cache module for SPyB.
+Keeps the processed lines and links of recently displayed pages in memory,
+so revisiting a page does not have to parse it again.
+"""
+
+# Standard library imports
+import sys
+import pickle
+import hashlib
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+# Local imports
+import app_confvars as confvars
+
+persist_path = (Path(__file__).parent / "../etc/pagecache.pickle").resolve()
+
+# Bumped whenever the layout of cached values changes
+FORMAT_VERSION = 4
+
+def pageKey(content, base_url):
+    """Build the cache key for a page.
+
+    Args:
+        content (str): Raw page content
+        base_url (str): URL the page was loaded from
+
+    Returns:
+        tuple: (content hash, base_url)
+    """
+    digest = hashlib.sha1(content.encode("utf-8", errors="surrogatepass")).hexdigest()
+    return (digest, base_url or "")
+
+def _estimateSize(value):
+    """Estimate the memory used by a cached (lines, links, positions) value."""
+    content_lines, links, link_positions = value
+    size = sys.getsizeof(content_lines)  # A LineStore counts its whole buffer
+    size += sys.getsizeof(links) + sum(sys.getsizeof(link) + sys.getsizeof(link.href) for link in links)
+    size += sys.getsizeof(link_positions) + sum(sys.getsizeof(spans) for spans in link_positions.values())
+    return size
+
+class PageCache:
+    """In-memory LRU cache of processed pages with a byte budget."""
+
+    def __init__(self, max_size=None, path=persist_path):
+        self.max_size = confvars.page_cache_size if max_size is None else max_size
+        self.path = Path(path)
+        self.entries = OrderedDict()  # key -> (value, size), least recently used first
+        self.total_size = 0
+        self.stats = {"hits": 0, "misses": 0}
+        self.lock = threading.Lock()  # Pages are also added by the prefetcher
+
+    def get(self, key):
+        """Return the cached (content_lines, links, link_positions) or None."""
+        with self.lock:
+            item = self.entries.get(key)
+            if item is None:
+                self.stats["misses"] += 1
+                return None
+            self.entries.move_to_end(key)
+            self.stats["hits"] += 1
+            return item[0]
+
+    def put(self, key, content_lines, links, link_positions):
+        """Store a processed page, evicting old pages to stay within budget."""
+        if self.max_size <= 0:
+            return
+        value = (content_lines, links, link_positions)
+        size = _estimateSize(value)
+        if size > self.max_size:
+            return
+        with self.lock:
+            self._discard(key)
+            self.entries[key] = (value, size)
+            self.total_size += size
+            while self.total_size > self.max_size:
+                _, (_, old_size) = self.entries.popitem(last=False)
+                self.total_size -= old_size
+
+    def discard(self, key):
+        """Remove a page from the cache if present."""
+        with self.lock:
+            self._discard(key)
+
+    def _discard(self, key):
+        item = self.entries.pop(key, None)
+        if item is not None:
+            self.total_size -= item[1]
+
+    def load(self):
+        """Load persisted pages from disk, ignoring a missing or broken file."""
+        try:
+            with open(self.path, "rb") as f:
+                saved = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ValueError):
+            return
+        if not isinstance(saved, dict) or saved.get("version") != FORMAT_VERSION:
+            return
+        for key, value in saved["pages"]:
+            self.put(key, *value)
+
+    def save(self):
+        """Write the cached pages to disk, least recently used first."""
+        with self.lock:
+            saved = {
+                "version": FORMAT_VERSION,
+                "pages": [(key, value) for key, (value, _) in self.entries.items()]
+            }
+        try:
+            with open(self.path, "wb") as f:
+                pickle.dump(saved, f, protocol=pickle.HIGHEST_PROTOCOL)
+        except OSError:
+            pass
+
+# Shared cache instance
+cache = PageCache()
+if confvars.page_cache_persist:
+    cache.load()
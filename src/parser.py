@@ -3,52 +3,368 @@ HTML Parser module for SPyB.
 Handles HTML content parsing and formatting for terminal display.
 """
 
-# Third-party imports
-from bs4 import BeautifulSoup
+# Standard library imports
+from collections import namedtuple
+from functools import lru_cache
+from html.parser import HTMLParser
+from importlib.util import find_spec
 from urllib.parse import urljoin
 
+# Third-party parsers (bs4, and the optional lxml and selectolax) are only
+# imported when a page is parsed with them, so starting the browser does not
+# wait for them
+
+# Local imports
+import logconf
+import app_confvars as confvars
+import timing
+from linestore import LineStore
+
+logger = logconf.logger
+
+DEFAULT_BACKEND = 'html.parser'
+
+# A link span inside a line: its text, absolute href and column range
+Link = namedtuple('Link', ['text', 'href', 'start', 'end'])
+
+# A display line: its text and the links it contains
+Line = namedtuple('Line', ['text', 'links'])
+
+# Elements whose content is never displayed
+SKIPPED_TAGS = ('script', 'style', 'template')
+
+@lru_cache(maxsize=4096)
+def resolve_href(href, base_url=None):
+    """Resolve a link target against the page URL."""
+    if base_url and not href.startswith(('http://', 'https://')):
+        return urljoin(base_url, href)
+    return href
+
 def format_link(text, href, base_url=None):
     """Format a link in markdown style."""
-    if base_url and not href.startswith(('http://', 'https://')):
-        href = urljoin(base_url, href)
-    return f"[{text}]({href})"
+    return f"[{text}]({resolve_href(href, base_url)})"
 
-def parse(html_body, base_url=None):
-    """Parse and format HTML content for terminal display.
+def _link_chunks(events):
+    """Turn the events of a tree walk into displayable chunks.
+
+    Links are handled as LineStream handles them while tokenizing, and as
+    the HTML standard nests them: any <a> closes the link still open, and
+    text after a nested link's </a> is no longer part of any link.
+
+    Args:
+        events (iterable): Text strings in document order, an href string
+            wrapped in a tuple where an <a href> starts, and None where
+            another <a> starts or any <a> ends
+
+    Yields:
+        str or tuple: Stripped text chunks, or (text, href) for links
+            with visible text
+    """
+    link = None  # (href, text parts) of the open link
+    for event in events:
+        if event.__class__ is str:
+            if link is not None:
+                link[1].append(event)
+            else:
+                text = event.strip()
+                if text:
+                    yield text
+            continue
+        if link is not None:
+            text = ''.join(link[1]).strip()
+            if text:  # Only treat links with visible text as links
+                yield (text, link[0])
+        link = (event[0], []) if event is not None else None
+    if link is not None:
+        text = ''.join(link[1]).strip()
+        if text:
+            yield (text, link[0])
+
+def _soup_events(html_body, builder):
+    """Walk a BeautifulSoup tree once, yielding the events _link_chunks() takes.
+
+    Only text nodes are displayed, including ruby annotations as the other
+    backends show them; comments, CDATA sections (bogus comments in HTML)
+    and doctypes are left out.
+    """
+    from bs4 import BeautifulSoup, NavigableString, Tag
+    from bs4.element import RubyParenthesisString, RubyTextString
+    text_types = (NavigableString, RubyTextString, RubyParenthesisString)
+    soup = BeautifulSoup(html_body, builder)
+    stack = list(reversed(soup.contents))
+    while stack:
+        node = stack.pop()
+        if node is None:
+            yield None
+        elif isinstance(node, Tag):
+            if node.name in SKIPPED_TAGS:
+                continue
+            if node.name == 'a':
+                yield (node['href'],) if node.has_attr('href') else None
+                stack.append(None)  # Where the link ends
+            stack.extend(reversed(node.contents))
+        elif type(node) in text_types:
+            yield str(node)
+
+def _html_parser_chunks(html_body):
+    return _link_chunks(_soup_events(html_body, 'html.parser'))
+
+def _lxml_chunks(html_body):
+    return _link_chunks(_soup_events(html_body, 'lxml'))
+
+def _selectolax_events(html_body):
+    """Walk a selectolax (lexbor) tree once, yielding the events _link_chunks() takes."""
+    from selectolax.lexbor import LexborHTMLParser
+    tree = LexborHTMLParser(html_body)
+    if tree.root is None:
+        return
+    stack = [tree.root.child]
+    while stack:
+        node = stack.pop()
+        if node is None:
+            continue
+        if node.__class__ is tuple:  # End of a link
+            yield None
+            continue
+        stack.append(node.next)
+        tag = node.tag
+        if tag == '-text':
+            yield node.text(deep=False)
+        elif tag in SKIPPED_TAGS or tag == '-comment':
+            continue
+        else:
+            if tag == 'a':
+                yield (node.attributes['href'] or "",) if 'href' in node.attributes else None
+                stack.append(())  # Where the link ends
+            stack.append(node.child)
+
+def _selectolax_chunks(html_body):
+    """Yield the displayable chunks of a page using the selectolax (lexbor) parser.
+
+    Walks the lexbor tree directly instead of building a BeautifulSoup
+    object, producing the same chunks as the BeautifulSoup backends.
+    """
+    return _link_chunks(_selectolax_events(html_body))
+
+# Registered backends: name -> (chunks function, module it needs)
+BACKENDS = {
+    'html.parser': (_html_parser_chunks, None),
+    'lxml': (_lxml_chunks, 'lxml'),
+    'selectolax': (_selectolax_chunks, 'selectolax.lexbor'),
+}
+
+@lru_cache(maxsize=None)
+def _installed(module):
+    """Check whether a module can be imported, without importing its contents."""
+    try:
+        return find_spec(module) is not None
+    except ImportError:  # Parent package missing
+        return False
+
+# Backends already reported as unavailable
+_unavailable = set()
+
+def get_backend(name=None):
+    """Look up a parser backend, falling back to html.parser.
+
+    Args:
+        name (str, optional): Backend name (default: the parser_backend setting)
+
+    Returns:
+        callable: Function yielding the displayable chunks of a page
+    """
+    name = confvars.parser_backend if name is None else name
+    chunks, module = BACKENDS.get(name, (None, None))
+    if chunks is None or (module is not None and not _installed(module)):
+        if name not in _unavailable:
+            _unavailable.add(name)
+            logger.warning(f"Parser backend '{name}' is not available, using {DEFAULT_BACKEND}")
+        chunks, _ = BACKENDS[DEFAULT_BACKEND]
+    return chunks
+
+def lines_from_chunks(chunks, base_url=None):
+    """Turn displayable chunks into Line records.
+    
+    Every text chunk becomes one or more lines and every link becomes its
+    own line holding a Link span, so callers never have to search the text
+    to find the links again.
+    
+    Args:
+        chunks (iterable): Text chunks and (text, href) link tuples
+        base_url (str, optional): Base URL for resolving relative links
+        
+    Yields:
+        Line: Line records in display order
+    """
+    for chunk in chunks:
+        if chunk.__class__ is tuple:
+            text, href = chunk
+            if '\n' in text:  # Keep every link on a single line
+                text = ' '.join(part.strip() for part in text.split('\n') if part.strip())
+            href = resolve_href(href, base_url)
+            # Only web links can be followed
+            links = [Link(text, href, 1, 1 + len(text))] if href.startswith(('http://', 'https://')) else []
+            yield Line(f"[{text}]({href})", links)
+        elif '\n' not in chunk:  # Chunks arrive stripped and non-empty
+            yield Line(chunk, [])
+        else:
+            for part in chunk.split('\n'):
+                part = part.strip()
+                if part:
+                    yield Line(part, [])
+
+@timing.timed("parse")
+def parse_lines(html_body, base_url=None, backend=None):
+    """Parse HTML content into display lines in a single tree walk.
     
     Args:
         html_body (str): Raw HTML content to parse
         base_url (str, optional): Base URL for resolving relative links
+        backend (str, optional): Parser backend name (default: parser_backend setting)
         
     Returns:
-        tuple: (formatted_text, line_count)
-            - formatted_text (str): Plain text extracted from HTML
-            - line_count (int): Number of lines in the formatted text
+        list: Line records in display order
     """
     if not html_body:
-        return ("No content available.", 1)
+        return [Line("No content available.", [])]
         
-    # Parse HTML using BeautifulSoup
-    soup = BeautifulSoup(html_body, 'html.parser')
-    
-    # Remove script and style elements
-    for script in soup(["script", "style"]):
-        script.decompose()
+    return list(lines_from_chunks(get_backend(backend)(html_body), base_url))
+
+@timing.timed("index")
+def index_lines(lines):
+    """Split Line records into the display text and link tables.
     
-    # Process links first
-    for link in soup.find_all('a', href=True):
-        href = link['href']
-        text = link.get_text().strip()
-        if text:  # Only process links with visible text
-            link.replace_with(format_link(text, href, base_url))
+    Args:
+        lines (iterable): Line records
+        
+    Returns:
+        tuple: (content_lines, links, link_positions)
+            - content_lines (LineStore): Text of every line
+            - links (list): Every Link in document order
+            - link_positions (dict): Line number -> tuple of the Links on that line, left to right
+    """
+    content_lines = LineStore()
+    links = []
+    link_positions = {}
+    for i, line in enumerate(lines):
+        content_lines.append(line.text)
+        if line.links:
+            links.extend(line.links)
+            link_positions[i] = tuple(line.links)
+    return (content_lines, links, link_positions)
+
+class LineStream(HTMLParser):
+    """Incremental HTML tokenizer producing Line records as data arrives.
     
-    # Get text and handle spacing
-    lines = []
-    for element in soup.stripped_strings:
-        lines.extend(element.split('\n'))
+    Feed it the page text piece by piece; every call returns the lines that
+    are complete so far. The output matches parse_lines() with the
+    html.parser backend: skipped elements, comments, CDATA sections and
+    other declarations are left out, and any <a> closes the link still open.
+    """
     
-    # Join lines with proper spacing
-    formatted_text = '\n'.join(line.strip() for line in lines if line.strip())
-    nlines = formatted_text.count('\n') + 1
+    def __init__(self, base_url=None):
+        super().__init__(convert_charrefs=True)
+        self.base_url = base_url
+        self.chunks = []
+        self.text = []  # Pieces of the current text node
+        self.skip_depth = 0
+        self.link = None  # (href, text parts) of the open link, if any
+        
+    def handle_starttag(self, tag, attrs):
+        self._close_text()
+        if tag in SKIPPED_TAGS:
+            self.skip_depth += 1
+        elif tag == 'a':
+            self._close_link()
+            attrs = dict(attrs)
+            if 'href' in attrs:
+                self.link = (attrs['href'] or "", [])
+                
+    def handle_endtag(self, tag):
+        self._close_text()
+        if tag in SKIPPED_TAGS:
+            self.skip_depth = max(0, self.skip_depth - 1)
+        elif tag == 'a':
+            self._close_link()
+            
+    def handle_data(self, data):
+        if self.skip_depth:
+            return
+        if self.link is not None:
+            self.link[1].append(data)
+        else:
+            self.text.append(data)
+            
+    def handle_comment(self, data):
+        self._close_text()
+        
+    def handle_decl(self, decl):
+        self._close_text()
+        
+    def handle_pi(self, data):
+        self._close_text()
+        
+    def unknown_decl(self, data):
+        self._close_text()  # CDATA sections, which HTML treats as comments
+        
+    def _close_text(self):
+        """Emit the current text node; the tokenizer may split one across calls."""
+        if self.text:
+            text = ''.join(self.text).strip()
+            self.text = []
+            if text:
+                self.chunks.append(text)
+                
+    def _close_link(self):
+        """Emit the open link, or its text if it has none visible."""
+        if self.link is None:
+            return
+        href, parts = self.link
+        self.link = None
+        text = ''.join(parts).strip()
+        if text:
+            self.chunks.append((text, href))
+            
+    def _take_lines(self):
+        lines = list(lines_from_chunks(self.chunks, self.base_url))
+        self.chunks = []
+        return lines
+        
+    @timing.timed("parse")
+    def feed(self, data):
+        """Feed more page text.
+        
+        Returns:
+            list: Line records completed by this piece of text
+        """
+        super().feed(data)
+        return self._take_lines()
+        
+    @timing.timed("parse")
+    def close(self):
+        """Finish the document.
+        
+        Returns:
+            list: Remaining Line records
+        """
+        super().close()
+        self._close_text()
+        self._close_link()
+        return self._take_lines()
+
+def parse(html_body, base_url=None, backend=None):
+    """Parse and format HTML content for terminal display.
     
-    return (formatted_text, nlines)
+    Args:
+        html_body (str): Raw HTML content to parse
+        base_url (str, optional): Base URL for resolving relative links
+        backend (str, optional): Parser backend name (default: parser_backend setting)
+        
+    Returns:
+        tuple: (formatted_text, line_count)
+            - formatted_text (str): Plain text extracted from HTML
+            - line_count (int): Number of lines in the formatted text
+    """
+    lines = parse_lines(html_body, base_url, backend)
+    formatted_text = '\n'.join(line.text for line in lines)
+    return (formatted_text, max(len(lines), 1))
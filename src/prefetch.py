@@ -0,0 +1,219 @@
+"""
+Link prefetching module for SPyB.
+Fetches and parses the pages behind visible links in the background, so
+following one of them renders without waiting for the network.
+"""
+
+# Standard library imports
+import time
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+# Local imports
+import logconf
+import fetcher
+import parser
+import pagecache
+import app_confvars as confvars
+from httpcache import parseCacheControl, freshnessLifetime
+
+logger = logconf.logger
+
+# Content types worth prefetching; anything else is a download, image, ...
+PAGE_TYPES = ("text/html", "application/xhtml+xml", "text/plain")
+
+def isPage(headers):
+    """Check whether a response is a page the browser would display, by its Content-Type."""
+    content_type = headers.get("Content-Type")
+    if not content_type:
+        return True
+    return content_type.split(";")[0].strip().lower() in PAGE_TYPES
+
+class Prefetcher:
+    """Background fetcher warming the caches for links the user may follow.
+
+    At most ``workers`` pages are fetched at once and at most one per host,
+    with ``host_delay`` seconds between requests to the same host. Fetched
+    bodies are kept until taken, within a budget of ``max_bytes``, for at
+    most ``ttl`` seconds or as long as the response says it stays fresh.
+    """
+
+    def __init__(self, workers=None, max_bytes=None, host_delay=None, ttl=None):
+        self.workers = confvars.prefetch_workers if workers is None else workers
+        self.max_bytes = confvars.prefetch_max_bytes if max_bytes is None else max_bytes
+        self.host_delay = confvars.prefetch_host_delay if host_delay is None else host_delay
+        self.ttl = confvars.prefetch_ttl if ttl is None else ttl
+        self.executor = None
+        self.lock = threading.Lock()
+        self.generation = 0  # Bumped by cancel() to drop queued work
+        self.pending = {}  # url -> future
+        self.results = OrderedDict()  # url -> (body, expiry time), oldest first
+        self.total_bytes = 0
+        self.busy_hosts = set()
+        self.last_request = {}  # host -> time of the last request
+        self.stats = {"scheduled": 0, "fetched": 0, "hits": 0, "misses": 0, "expired": 0}
+
+    @property
+    def enabled(self):
+        return self.workers > 0 and self.max_bytes > 0
+
+    def lifetime(self, headers):
+        """Return how many seconds a prefetched body may be served.
+
+        Follows the response's Cache-Control and Expires headers as the
+        HTTP cache does, but never exceeds ``ttl``; a response without
+        them is kept for ``ttl`` seconds.
+
+        Args:
+            headers (Mapping): Response headers
+
+        Returns:
+            float: Seconds, 0 if the body must not be kept
+        """
+        cc = parseCacheControl(headers.get("Cache-Control"))
+        if "no-store" in cc or "no-cache" in cc:
+            return 0
+        if "max-age" in cc or "s-maxage" in cc or "Expires" in headers:
+            return min(self.ttl, freshnessLifetime(headers, time.time()))
+        return self.ttl
+
+    def hitRate(self):
+        """Return the share of navigations served by a prefetched page."""
+        taken = self.stats["hits"] + self.stats["misses"]
+        return self.stats["hits"] / taken if taken else 0.0
+
+    def schedule(self, urls):
+        """Queue URLs for prefetching, skipping those already known.
+
+        Args:
+            urls (iterable): URLs in priority order
+        """
+        if not self.enabled:
+            return
+        with self.lock:
+            if self.executor is None:
+                self.executor = ThreadPoolExecutor(self.workers, thread_name_prefix="spyb-prefetch")
+            now = time.monotonic()
+            for url in urls:
+                if url in self.results and self.results[url][1] <= now:
+                    self._discard(url)  # Expired; fetch it again
+                if url in self.pending or url in self.results:
+                    continue
+                self.pending[url] = self.executor.submit(self._run, url, self.generation)
+                self.stats["scheduled"] += 1
+
+    def cancel(self):
+        """Drop all queued prefetches; finished pages are kept."""
+        with self.lock:
+            self.generation += 1
+            for future in self.pending.values():
+                future.cancel()
+            self.pending = {url: f for url, f in self.pending.items() if not f.cancelled()}
+
+    def take(self, url):
+        """Return the prefetched body for a URL, or None.
+
+        Bodies kept longer than their lifetime count as misses, so the page
+        is fetched again under the HTTP cache's freshness rules.
+
+        Args:
+            url (str): URL about to be displayed
+
+        Returns:
+            str or None: Page body if it was prefetched and is still fresh
+        """
+        if not self.enabled:
+            return None
+        with self.lock:
+            item = self._discard(url)
+            if item is None or item[1] <= time.monotonic():
+                if item is not None:
+                    self.stats["expired"] += 1
+                self.stats["misses"] += 1
+                return None
+            self.stats["hits"] += 1
+            return item[0]
+
+    def _discard(self, url):
+        """Remove a kept body. Must be called with the lock held.
+
+        Returns:
+            tuple or None: The (body, expiry time) removed
+        """
+        item = self.results.pop(url, None)
+        if item is not None:
+            self.total_bytes -= len(item[0])
+        return item
+
+    def shutdown(self):
+        """Stop the worker threads, abandoning queued prefetches."""
+        with self.lock:
+            self.generation += 1
+            if self.executor is not None:
+                self.executor.shutdown(wait=False, cancel_futures=True)
+                self.executor = None
+
+    def _acquireHost(self, host, generation):
+        """Wait until the host may be contacted again.
+
+        Returns:
+            bool: False if the prefetch was cancelled while waiting
+        """
+        while True:
+            with self.lock:
+                if generation != self.generation:
+                    return False
+                wait = self.last_request.get(host, 0) + self.host_delay - time.monotonic()
+                if host not in self.busy_hosts and wait <= 0:
+                    self.busy_hosts.add(host)
+                    return True
+            time.sleep(min(max(wait, 0.05), 0.25))
+
+    def _releaseHost(self, host):
+        with self.lock:
+            self.busy_hosts.discard(host)
+            self.last_request[host] = time.monotonic()
+
+    def _run(self, url, generation):
+        """Worker: fetch a page, parse it into the page cache and keep its body."""
+        try:
+            parsed = fetcher.parseURL(url)
+            host = parsed.host if parsed is not None else ""
+            if not self._acquireHost(host, generation):
+                return
+            headers = []
+
+            def check(response_headers):
+                headers.append(response_headers)
+                return isPage(response_headers)
+            try:
+                # Downloads and other large bodies are dropped before they are read in full
+                body = fetcher.fetcher(url, on_headers=check, max_bytes=self.max_bytes)
+            finally:
+                self._releaseHost(host)
+            if not isinstance(body, str) or len(body) > self.max_bytes:
+                return
+
+            page = parser.index_lines(parser.parse_lines(body, base_url=url))
+            pagecache.cache.put(pagecache.pageKey(body, url), *page)
+
+            lifetime = self.lifetime(headers[0]) if headers else 0
+            if lifetime <= 0:
+                return
+            with self.lock:
+                self._discard(url)
+                self.results[url] = (body, time.monotonic() + lifetime)
+                self.total_bytes += len(body)
+                self.stats["fetched"] += 1
+                while self.total_bytes > self.max_bytes:
+                    _, (old, _) = self.results.popitem(last=False)
+                    self.total_bytes -= len(old)
+        except Exception as e:  # A failed prefetch must never disturb browsing
+            logger.debug("Prefetching %s failed: %s", url, e)
+        finally:
+            with self.lock:
+                self.pending.pop(url, None)
+
+# Shared prefetcher instance
+prefetcher = Prefetcher()
@@ -0,0 +1,171 @@
+"""
+Find-in-page index module for SPyB.
+Keeps a lowercase copy of a page laid out for fast substring search, so a
+search never lowercases or splits the page again.
+"""
+
+# Standard library imports
+import re
+from array import array
+from bisect import bisect_right
+from itertools import accumulate
+
+def _lower(text):
+    """Lowercase text without changing its length, so columns stay valid."""
+    low = text.lower()
+    if len(low) != len(text):  # A few characters (like U+0130) lowercase to two
+        low = ''.join(c.lower() if len(c.lower()) == 1 else c for c in text)
+    return low
+
+def is_case_sensitive(term, regex=False):
+    """Smart case: a search only respects case if its term has an uppercase letter.
+
+    In a regular expression, escapes such as \\S or \\W do not count.
+    """
+    if regex:
+        term = re.sub(r'\\.', '', term)
+    return any(c.isupper() for c in term)
+
+class SearchIndex:
+    """Find-in-page index over the lines of a page.
+
+    The lowercase page is kept in blocks of BLOCK_LINES lines joined by
+    newlines, with the offset of every line in its block. A search runs
+    str.find over each block and maps the hits back to lines; the columns
+    of the hits on a line are worked out when it is drawn, and cached.
+
+    Case-sensitive searches use the lowercase copy to find candidate lines
+    and check them against the page. Regular expressions are matched line by
+    line. When a plain term grows by typing, the lines that matched the
+    shorter term are the only candidates, if there are few enough of them.
+
+    The page may still be growing (streamed or lazily parsed pages);
+    ``update()`` indexes the lines added since the last call.
+    """
+
+    # Lines per block of lowercase text
+    BLOCK_LINES = 256
+
+    def __init__(self, lines):
+        self.lines = lines
+        self.blocks = []  # Lowercase text of each block
+        self.starts = []  # Offsets of the lines in each block, plus the block length
+        self.indexed = 0  # Lines covered by the blocks
+        self.term = ""  # Term of the last search
+        self.needle = ""  # Its lowercase form
+        self.regex = False
+        self.case_sensitive = False
+        self.pattern = None  # Compiled term of a regex search
+        self.matches = []  # Result of the last search
+        self.searched = 0  # Lines indexed at the last search
+        self.span_cache = {}  # Line number -> spans of the term on it
+        self.update()
+
+    def update(self):
+        """Index the lines appended to the page since the last update."""
+        count = len(self.lines)
+        if count == self.indexed:
+            return
+        size = self.BLOCK_LINES
+        # A partly filled last block is built again with the new lines
+        complete = self.indexed // size
+        del self.blocks[complete:]
+        del self.starts[complete:]
+        for first in range(complete * size, count, size):
+            chunk = self.lines[first:min(first + size, count)]
+            self.blocks.append(_lower('\n'.join(chunk)))
+            self.starts.append(array('I', accumulate((len(line) + 1 for line in chunk), initial=0)))
+        self.indexed = count
+
+    def search(self, term, regex=False, case_sensitive=False):
+        """Find the lines matching a term.
+
+        The term becomes the current one for ``spans()``.
+
+        Args:
+            term (str): Text or regular expression to look for
+            regex (bool): Treat the term as a regular expression
+            case_sensitive (bool): Respect case
+
+        Returns:
+            list: Numbers of the matching lines, in order
+
+        Raises:
+            re.error: If the regular expression is invalid
+        """
+        self.update()
+        pattern = re.compile(term, 0 if case_sensitive else re.IGNORECASE) if regex else None
+        # Checking the previous matches one by one only beats scanning if they are few
+        narrow = (
+            not regex and not self.regex and self.term and term.startswith(self.term)
+            and (case_sensitive or not self.case_sensitive)
+            and self.searched == self.indexed and len(self.matches) * 8 < self.indexed
+        )
+        previous = self.matches
+        self.term = term
+        self.needle = _lower(term)
+        self.regex = regex
+        self.case_sensitive = case_sensitive
+        self.pattern = pattern
+        self.span_cache = {}
+        self.searched = self.indexed
+
+        if not term:
+            matches = []
+        elif regex:
+            matches = [i for i, line in enumerate(self.lines) if pattern.search(line)]
+        elif narrow:
+            matches = [i for i in previous if self._contains(i)]
+        else:
+            matches = self._find(self.needle)
+            if case_sensitive:
+                matches = [i for i in matches if term in self.lines[i]]
+        self.matches = matches
+        return matches
+
+    def _find(self, needle):
+        """Return the lines whose lowercase text contains a lowercase needle."""
+        matches = []
+        for number, text in enumerate(self.blocks):
+            pos = text.find(needle)
+            if pos == -1:
+                continue
+            starts = self.starts[number]
+            base = number * self.BLOCK_LINES
+            while pos != -1:
+                k = bisect_right(starts, pos) - 1
+                matches.append(base + k)
+                # Continue on the next line; spans() finds the other hits on this one
+                pos = text.find(needle, starts[k + 1])
+        return matches
+
+    def _lowerLine(self, i):
+        number, k = divmod(i, self.BLOCK_LINES)
+        starts = self.starts[number]
+        return self.blocks[number][starts[k]:starts[k + 1] - 1]
+
+    def _contains(self, i):
+        if self.case_sensitive:
+            return self.term in self.lines[i]
+        return self.needle in self._lowerLine(i)
+
+    def spans(self, i):
+        """Return the (start, end) columns of the current term on line ``i``."""
+        found = self.span_cache.get(i)
+        if found is not None:
+            return found
+        found = []
+        if i >= self.indexed:  # The page grew since the search
+            self.update()
+        if self.term and i < self.indexed:
+            if self.regex:
+                # Empty matches (like those of "a*") have nothing to highlight
+                found = [m.span() for m in self.pattern.finditer(self.lines[i]) if m.end() > m.start()]
+            else:
+                text, term = (self.lines[i], self.term) if self.case_sensitive else (self._lowerLine(i), self.needle)
+                pos = text.find(term)
+                while pos != -1:
+                    found.append((pos, pos + len(term)))
+                    pos = text.find(term, pos + len(term))
+        self.span_cache[i] = found
+        return found
@@ -0,0 +1,173 @@
+"""
+Session module for SPyB.
+Saves the history, view positions and rendered pages when the browser is
+closed, and maps them back into memory on the next start, so the last page
+is shown again without fetching or parsing it.
+
+File layout (integers little-endian, line offsets in native byte order):
+    header    magic, format version, metadata offset and length
+    segments  one per page for its lines and one for its links, each
+              starting on a mapping boundary: the UTF-8 text, padding to 4
+              bytes, the line offsets as unsigned 32-bit integers and, for
+              links, a (line, start, end) table of the same integers
+    metadata  JSON with the URLs, positions and segment locations
+"""
+
+# Standard library imports
+import os
+import json
+import mmap
+import struct
+from array import array
+from pathlib import Path
+
+# Local imports
+from parser import Link
+from linestore import LineStore
+from history import HistoryEntry, Snapshot
+
+session_path = (Path(__file__).parent / "../etc/session.spyb").resolve()
+
+MAGIC = b"SPyBsess"
+
+# Bumped whenever the layout of the file changes
+FORMAT_VERSION = 1
+
+HEADER = struct.Struct("<8sIQQ")  # Magic, version, metadata offset, metadata length
+
+def _writeSegment(f, store, table=None):
+    """Write a LineStore, and optionally a table of integers, as one segment.
+
+    Returns:
+        list: [start, length, offsets position, line count] of the segment
+    """
+    start = -(-f.tell() // mmap.ALLOCATIONGRANULARITY) * mmap.ALLOCATIONGRANULARITY
+    f.seek(start)
+    offsets = store.offsets
+    count = len(offsets) - 1
+    with memoryview(store.buffer) as text:
+        f.write(text[:offsets[count]])
+    f.write(b"\0" * (-f.tell() % 4))
+    offsets_pos = f.tell() - start
+    f.write(array('I', offsets))
+    if table is not None:
+        f.write(table)
+    return [start, f.tell() - start, offsets_pos, count]
+
+def _linkData(link_positions):
+    """Split a page's links into their strings (text, href, ...) and a (line, start, end) table."""
+    strings = LineStore()
+    table = array('I')
+    for line in sorted(link_positions):
+        for link in link_positions[line]:
+            strings.append(link.text)
+            strings.append(link.href)
+            table.extend((line, link.start, link.end))
+    return strings, table
+
+def save(history, current_url, page=None, path=session_path):
+    """Write the session to disk, replacing the previous one.
+
+    Args:
+        history (History): Back/forward stack; pages with a snapshot are saved
+        current_url (str): URL of the page shown
+        page (tuple, optional): (content_lines, link_positions) saved for the
+            current entry instead of its snapshot; None saves it without
+            its page, e.g. while it is still being parsed
+        path (Path): Session file
+    """
+    path = Path(path)
+    temp_path = path.with_suffix(f".{os.getpid()}.tmp")
+    entries = []
+    try:
+        with open(temp_path, "wb") as f:
+            f.write(HEADER.pack(MAGIC, FORMAT_VERSION, 0, 0))
+            for entry in history.entries:
+                if entry is history.current:
+                    tables = page
+                elif entry.snapshot is not None:
+                    tables = (entry.snapshot.lines, dict(entry.snapshot.links))
+                else:
+                    tables = None
+                item = {"url": entry.url, "scroll_pos": entry.scroll_pos, "cursor_y": entry.cursor_y,
+                        "lines": None, "links": None}
+                if tables is not None:
+                    content_lines, link_positions = tables
+                    item["lines"] = _writeSegment(f, content_lines)
+                    item["links"] = _writeSegment(f, *_linkData(link_positions))
+                entries.append(item)
+            meta = json.dumps({"current_url": current_url, "index": history.index, "entries": entries}).encode()
+            meta_pos = f.tell()
+            f.write(meta)
+            f.seek(0)
+            f.write(HEADER.pack(MAGIC, FORMAT_VERSION, meta_pos, len(meta)))
+        os.replace(temp_path, path)  # Pages mapped from the old file stay readable
+    except OSError:
+        try:
+            temp_path.unlink()
+        except OSError:
+            pass
+
+def _mapSegment(fd, segment):
+    """Map a segment of the session file.
+
+    Returns:
+        tuple: (LineStore over the mapped text, memoryview of the table after it)
+    """
+    start, length, offsets_pos, count = segment
+    data = mmap.mmap(fd, length, access=mmap.ACCESS_READ, offset=start)
+    table_pos = offsets_pos + 4 * (count + 1)
+    view = memoryview(data)
+    offsets = view[offsets_pos:table_pos].cast('I')
+    if len(offsets) != count + 1 or offsets[count] > offsets_pos or len(view[table_pos:]) % 4:
+        raise ValueError("Damaged session segment")
+    return LineStore.from_buffer(data, offsets), view[table_pos:].cast('I')
+
+def _linkPositions(strings, table):
+    """Rebuild link_positions from the strings and table written by _linkData()."""
+    link_positions = {}
+    values = table.tolist()
+    strings = list(strings)  # Decoded a block at a time
+    for k in range(len(values) // 3):
+        line, start, end = values[3 * k:3 * k + 3]
+        link = Link(strings[2 * k], strings[2 * k + 1], start, end)
+        link_positions.setdefault(line, []).append(link)
+    return {line: tuple(spans) for line, spans in link_positions.items()}
+
+def _restoreEntry(fd, item):
+    entry = HistoryEntry(item["url"])
+    entry.scroll_pos = item["scroll_pos"]
+    entry.cursor_y = item["cursor_y"]
+    if item["lines"] is not None:
+        content_lines, _ = _mapSegment(fd, item["lines"])
+        entry.snapshot = Snapshot(content_lines, _linkPositions(*_mapSegment(fd, item["links"])))
+    return entry
+
+def load(path=session_path):
+    """Read the last session, mapping its pages instead of reading them.
+
+    The text and line offsets of every page are used straight from the
+    mapped file; only the links are decoded.
+
+    Args:
+        path (Path): Session file
+
+    Returns:
+        tuple or None: (history entries, index of the current entry, current
+            URL), or None if there is no usable session
+    """
+    try:
+        with open(path, "rb") as f:
+            magic, version, meta_pos, meta_len = HEADER.unpack(f.read(HEADER.size))
+            if magic != MAGIC or version != FORMAT_VERSION:
+                return None
+            f.seek(meta_pos)
+            meta = json.loads(f.read(meta_len))
+            # The mappings keep their own handle on the file
+            entries = [_restoreEntry(f.fileno(), item) for item in meta["entries"]]
+        index = meta["index"]
+        if not -1 <= index < len(entries):
+            return None
+        return entries, index, meta["current_url"]
+    except (OSError, ValueError, TypeError, KeyError, IndexError, struct.error):
+        return None
@@ -0,0 +1,194 @@
+"""
+Timing module for SPyB.
+Measures where the time of a page load goes (DNS, connect, request,
+download, decode, parse, index, display and draw) and logs a breakdown for
+every page.
+
+Spans are only recorded while timing is enabled (perf_spans setting, or the
+performance overlay) and only in threads working for the page being loaded.
+Otherwise span() hands out a shared no-op span, so the instrumented code
+pays a flag check and nothing more.
+"""
+
+# Standard library imports
+import logging
+import threading
+from functools import wraps
+from time import perf_counter
+
+# Local imports
+import logconf
+import app_confvars as confvars
+
+logger = logconf.logger
+
+# Phases in the order they happen during a page load
+PHASES = ("dns", "connect", "request", "download", "decode", "parse", "index", "display", "draw")
+
+# Whether spans are recorded; the performance overlay turns this on at runtime
+enabled = confvars.perf_spans
+
+# Timings of the page loaded last, finished or not
+last_page = None
+
+_local = threading.local()  # page: PageTiming of this thread, stack: open spans
+
+class PageTiming:
+    """Time spent in each phase while loading one page.
+
+    Spans exclude the spans nested in them, so the phases add up to the
+    time measured.
+    """
+
+    def __init__(self, url):
+        self.url = url
+        self.totals = {}  # phase -> seconds
+        self.counts = {}  # phase -> number of spans
+        self.finished = False
+        self.lock = threading.Lock()  # Spans are added by the fetch and UI threads
+
+    def add(self, phase, seconds):
+        with self.lock:
+            self.totals[phase] = self.totals.get(phase, 0.0) + seconds
+            self.counts[phase] = self.counts.get(phase, 0) + 1
+
+    def summary(self):
+        """Describe the phases in milliseconds, e.g. "12.4 ms: dns 0.1, parse 12.3"."""
+        with self.lock:
+            totals = dict(self.totals)
+        parts = [f"{phase} {totals[phase] * 1000:.1f}" for phase in PHASES if phase in totals]
+        return f"{sum(totals.values()) * 1000:.1f} ms: " + ", ".join(parts)
+
+class _Span:
+    """Context manager timing one phase of a page."""
+
+    __slots__ = ("page", "phase", "start", "nested")
+
+    def __init__(self, page, phase):
+        self.page = page
+        self.phase = phase
+
+    def __enter__(self):
+        stack = _local.__dict__.setdefault("stack", [])
+        stack.append(self)
+        self.nested = 0.0
+        self.start = perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = perf_counter() - self.start
+        stack = _local.stack
+        stack.pop()
+        if stack:
+            stack[-1].nested += elapsed
+        self.page.add(self.phase, elapsed - self.nested)
+        return False
+
+class _NullSpan:
+    """Span recording nothing, used while timing is off."""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+_NULL_SPAN = _NullSpan()
+
+def currentPage():
+    """Return the PageTiming this thread records into, or None."""
+    if not enabled:
+        return None
+    return getattr(_local, "page", None)
+
+def span(phase):
+    """Return a context manager timing a phase of the current page.
+
+    Args:
+        phase (str): One of PHASES
+
+    Returns:
+        Context manager; a shared no-op one if nothing is being recorded
+    """
+    page = currentPage()
+    if page is None:
+        return _NULL_SPAN
+    return _Span(page, phase)
+
+def timed(phase):
+    """Decorator timing every call of a function as a phase."""
+    def decorate(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not enabled:
+                return func(*args, **kwargs)
+            with span(phase):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+def timedIter(iterable, phase):
+    """Time the steps of an iterator, e.g. the chunks of a download, as a phase.
+
+    Returns:
+        iterator: ``iterable`` itself if nothing is being recorded
+    """
+    page = currentPage()
+    if page is None:
+        return iterable
+    return _timedSteps(iter(iterable), page, phase)
+
+def _timedSteps(iterator, page, phase):
+    while True:
+        with _Span(page, phase):
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+        yield item
+
+def startPage(url):
+    """Start recording the timings of a page load in the calling thread.
+
+    Returns:
+        PageTiming or None: The new record, None while timing is off
+    """
+    global last_page
+    _local.page = None
+    if not enabled:
+        return None
+    _local.page = last_page = PageTiming(url)
+    return last_page
+
+def bind(func):
+    """Make a function record into the calling thread's page.
+
+    Used for the worker thread of a page load. The page stays current in
+    the worker for the rest of its life, so a streamed body read after
+    ``func`` returns is still counted.
+    """
+    page = currentPage()
+    if page is None:
+        return func
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        _local.page = page
+        return func(*args, **kwargs)
+    return wrapper
+
+def finishPage():
+    """Stop recording the current page and log its breakdown.
+
+    Returns:
+        PageTiming or None: The finished record, None if none was recording
+    """
+    page = getattr(_local, "page", None)
+    _local.page = None
+    if page is None:
+        return None
+    page.finished = True
+    if logger.isEnabledFor(logging.DEBUG):  # Skip building the summary if nobody logs it
+        logger.debug(f"Page timings for {page.url}: {page.summary()}")
+    return page
@@ -3,24 +3,67 @@ Text User Interface (TUI) module for SPyB.
 Provides curses-based interface for browsing web content.
 """
 
+import re
 import curses
 import logging
+import importlib
+import threading
 from pathlib import Path
+from collections import OrderedDict
 
 # Local imports
 import logconf
 import fetcher
 import parser
+import pagecache
+import session
+import timing
 import app_confvars as confvars
+from loader import PageLoad
+from linestore import LineStore
+from lazypage import LazyPage
+from searchindex import SearchIndex, is_case_sensitive
+from wrapmap import WrapMap
+from prefetch import prefetcher
+from history import History
 
 logger = logconf.logger
 
+# Text written to the screen: keystrokes handled, bytes drawn in total and for the last key
+redraw_stats = {"keys": 0, "bytes": 0, "last_key_bytes": 0}
+
+# Libraries imported on first use, loaded in the background once the screen is up
+PRELOAD_MODULES = ("requests", "bs4")
+
 def cleanup():
-    """Clean up the terminal state."""
+    """Clean up the terminal state and close pooled connections."""
+    prefetcher.shutdown()
+    fetcher.closeSession()
+    logger.debug(f"HTTP cache stats: {fetcher.cache.stats}")
+    logger.debug(f"Prefetch stats: {prefetcher.stats}")
+    if redraw_stats["keys"]:
+        logger.debug(f"Redraw stats: {redraw_stats}, {redraw_stats['bytes'] / redraw_stats['keys']:.0f} bytes per key")
+    if confvars.page_cache_persist:
+        pagecache.cache.save()
     curses.nocbreak()
     curses.echo()
     curses.endwin()
 
+def preload():
+    """Import the libraries left out of startup in a background thread.
+    
+    The networking and HTML libraries are imported on first use, so the URL
+    bar shows without waiting for them. Loading them while a URL is typed
+    keeps that wait out of the first page load as well.
+    """
+    def run():
+        for name in PRELOAD_MODULES:
+            try:
+                importlib.import_module(name)
+            except ImportError:
+                pass
+    threading.Thread(target=run, name="spyb-preload", daemon=True).start()
+    
 def init_tui(control_style='vim'):
     """Initialize the TUI with the specified control style."""
     global screen, num_rows, num_cols
@@ -29,9 +72,22 @@ def init_tui(control_style='vim'):
     curses.cbreak()
     screen.keypad(True)
     num_rows, num_cols = screen.getmaxyx()
+    preload()
     return TUI(control_style)
 
 class TUI:
+    # Milliseconds of no typing before a large page is searched
+    SEARCH_DEBOUNCE = 150
+    
+    # Letters used for link hint labels, easiest to reach first
+    HINT_KEYS = "asdfghjklqwertyuiopzxcvbnm"
+    
+    # Milliseconds without a new size before a resize is carried out
+    RESIZE_SETTLE = 50
+    
+    # Widths whose wrap map of the page is kept, for resizing back and forth
+    WRAP_WIDTHS = 4
+    
     def __init__(self, control_style='vim'):
         self.control_style = control_style
         self.controls_map = {
@@ -41,31 +97,41 @@ class TUI:
         }.get(control_style.lower(), VIM_CONTROLS)
         
         self.current_url = ""
-        self.scroll_pos = 0
-        self.cursor_y = 0
-        self.content_lines = []
+        self.page_url = ""  # URL of the page currently displayed
+        self.loading = None  # PageLoad in progress, if any
+        self.scroll_pos = 0  # Row of the wrapped page shown at the top
+        self.cursor_y = 0  # Row of the cursor in the content window
+        self.content_lines = LineStore()
+        self.wrap_maps = OrderedDict()  # Width -> WrapMap of wrap_page, most recently used last
+        self.wrap_page = None
         self.links = []
         self.link_positions = {}
+        self.link_line = -1  # Line where link_choice applies; elsewhere the first link is selected
+        self.link_choice = 0  # Index of the selected link among those on link_line
+        self.hints = None  # Hint label -> (line, link index) while choosing a link by its label
+        self.hint_prefix = ""  # Part of a hint label typed so far
+        self.lazy_page = None  # LazyPage still being parsed, if any
+        self.shown_position = None  # Position indicator last drawn in the address bar
         self.last_search = ""
+        self.search_regex = False  # Whether last_search is a regular expression
         self.search_matches = []  # List of line numbers containing matches
         self.current_match = -1  # Index into search_matches
+        self.search_index = SearchIndex(self.content_lines)
         self.should_quit = False
         self.should_start_durak = False  # New flag for durak easter egg
+        self.history = History()
+        self.history_move = None  # (entry, step) of a history move whose page is being refetched
+        self.history_step = None  # Back/forward step requested while a page was loading
+        self.delays = {}  # Window -> milliseconds its getch() waits for a key, -1 for ever
+        self.show_timings = False  # Whether the controls bar shows the last page's phase timings
         
         # Create windows
         self.init_windows()
         
     def init_windows(self):
-        """Initialize or reinitialize the screen state"""
+        """Initialize the screen state"""
         global address_bar, controls, content_win
         
-        # If we're reinitializing, clean up first
-        if hasattr(self, 'screen'):
-            curses.nocbreak()
-            self.screen.keypad(False)
-            curses.echo()
-            curses.endwin()
-        
         # Initialize screen
         self.screen = screen
         
@@ -92,6 +158,9 @@ class TUI:
         
         self.address_bar.bkgd(' ', curses.color_pair(1))
         self.content_win.bkgd(' ', curses.color_pair(3))
+        self.content_win.idlok(True)  # Let curses scroll with the terminal's line operations
+        self.invalidate_display()
+        self.controls_drawn = None  # (controls map, width, overlay) the controls bar was drawn for
         
         # Set up input handling
         curses.noecho()
@@ -104,6 +173,97 @@ class TUI:
         self.controls.refresh()
         self.content_win.refresh()
 
+    def resize(self):
+        """Fit the windows to a new terminal size, keeping the cursor on its line.
+        
+        The windows are resized in place and the page is reflowed from its
+        wrap map for the new width. Resizes that follow each other within
+        RESIZE_SETTLE milliseconds, as when dragging a window edge, are
+        carried out once.
+        """
+        global num_rows, num_cols
+        while self.key_pending(self.RESIZE_SETTLE, self.screen):
+            key = self.screen.getch()
+            if key != curses.KEY_RESIZE:
+                curses.ungetch(key)
+                break
+        rows, cols = self.screen.getmaxyx()
+        if (rows, cols) == (num_rows, num_cols):
+            return
+        top = self.text_position(self.scroll_pos)
+        cursor = self.text_position(self.scroll_pos + self.cursor_y)
+        num_rows, num_cols = rows, cols
+        try:
+            self.address_bar.resize(1, cols)
+            self.controls.resize(1, cols)
+            self.controls.mvwin(rows - 1, 0)
+            self.content_win.resize(max(1, rows - 2), cols)
+        except curses.error:
+            pass  # Too small to show anything; the next resize fixes it
+        self.screen.erase()
+        self.screen.refresh()
+        self.invalidate_display()
+        self.controls_drawn = None
+        
+        # Keep the top line in place if the cursor line stays on screen
+        height = num_rows - 2
+        scroll_pos = self.row_at(*top)
+        scroll_pos = max(0, min(scroll_pos, self.wrap_map().total(scroll_pos + height) - height))
+        cursor_row = self.row_at(*cursor)
+        if not scroll_pos <= cursor_row < scroll_pos + height:
+            scroll_pos = max(0, cursor_row - (height - 1))
+        self.scroll_pos = scroll_pos
+        self.cursor_y = cursor_row - scroll_pos
+        self.show_address()
+        self.refresh_display()
+        
+    def wrap_map(self):
+        """Return the wrap map of the page at the current width."""
+        if self.wrap_page is not self.content_lines:
+            self.wrap_maps.clear()
+            self.wrap_page = self.content_lines
+        wrap = self.wrap_maps.get(num_cols)
+        if wrap is None:
+            wrap = self.wrap_maps[num_cols] = WrapMap(self.content_lines, num_cols)
+            if len(self.wrap_maps) > self.WRAP_WIDTHS:
+                self.wrap_maps.popitem(last=False)
+        else:
+            self.wrap_maps.move_to_end(num_cols)
+        return wrap
+        
+    def text_position(self, row):
+        """Return the (line, column) shown at the start of a row of the wrapped page."""
+        i, k = self.wrap_map().line_at(row)
+        return i, k * num_cols
+        
+    def row_at(self, line, column=0):
+        """Return the row of the wrapped page showing a column of a line."""
+        wrap = self.wrap_map()
+        return wrap.row_of(line) + min(column // num_cols, wrap.rows(line) - 1)
+        
+    def cursor_line(self):
+        """Return the number of the line under the cursor."""
+        return self.wrap_map().line_at(self.scroll_pos + self.cursor_y)[0]
+        
+    def visible_lines(self):
+        """Return the range of the lines at least partly on screen."""
+        wrap = self.wrap_map()
+        first = wrap.line_at(self.scroll_pos)[0]
+        last = wrap.line_at(self.scroll_pos + num_rows - 3)[0]
+        return range(first, min(last + 1, len(self.content_lines)))
+        
+    def restore_position(self, entry):
+        """Scroll back to where the page of a history entry was left."""
+        top = min(entry.scroll_pos, max(0, len(self.content_lines) - 1))
+        self.scroll_pos = self.row_at(top)
+        self.cursor_y = self.row_at(top + entry.cursor_y) - self.scroll_pos
+        
+    def save_position(self):
+        """Remember the top and cursor lines of the page in the history."""
+        top = self.wrap_map().line_at(self.scroll_pos)[0]
+        self.history.savePosition(top, self.cursor_line() - top)
+        
+    @timing.timed("display")
     def display_html(self, content):
         """Display parsed HTML content in the content window."""
         if content is None:
@@ -114,37 +274,360 @@ class TUI:
             if self.handle_http_error(status, reason, error_content):
                 return "RETRY"
             return
+        elif not isinstance(content, str):
+            return self.stream_html(content)
             
-        from parser import parse
+        self.page_url = self.current_url
+        self.lazy_page = None
         
-        # Parse HTML and get formatted text
-        formatted_content, num_lines = parse(content, base_url=self.current_url)
-        if formatted_content is None:
-            self.show_error("Failed to parse content.")
-            return
+        # Revisited pages are served from the parsed page cache
+        key = pagecache.pageKey(content, self.current_url)
+        cached = pagecache.cache.get(key)
+        if cached is not None:
+            self.content_lines, self.links, self.link_positions = cached
+        elif 0 < confvars.lazy_parse_min_size <= len(content):
+            # Long pages are parsed as they scroll into view, the rest in the background
+            def cache_page(page):
+                pagecache.cache.put(key, page.content_lines, page.links, page.link_positions)
+                # The history took its snapshot after the first screenful
+                self.history.refresh(page.content_lines, page.link_positions)
+            self.lazy_page = LazyPage(content, base_url=self.current_url, on_done=cache_page)
+            self.content_lines = self.lazy_page.content_lines
+            self.links = self.lazy_page.links
+            self.link_positions = self.lazy_page.link_positions
+            self.ensure_lines(num_rows - 1 + confvars.lazy_parse_lookahead)
+        else:
+            # Parse HTML into line records carrying their link spans
+            lines = parser.parse_lines(content, base_url=self.current_url)
+            self.content_lines, self.links, self.link_positions = parser.index_lines(lines)
+            pagecache.cache.put(key, self.content_lines, self.links, self.link_positions)
+                
+        self.cursor_y = 0
+        self.scroll_pos = 0
+        self.link_line = -1
+        self.index_page()
+        self.record_history()
+        self.show_address()
+        self.refresh_display()
+        if self.lazy_page is not None:
+            self.lazy_page.start()
+        self.prefetch_links()
+        
+    def stream_html(self, chunks):
+        """Display a page incrementally while it is still downloading.
+        
+        Lines are appended to content_lines as soon as they are parsed, so the
+        first screenful is painted before the download finishes. Input is
+        handled between chunks, which keeps scrolling live while loading, and
+        Esc stops the download keeping what has arrived so far, and so does
+        back/forward before it moves in the history. A download that breaks
+        off keeps it as well and reports the error. Either way the partial
+        page is not cached.
+        
+        Args:
+            chunks (iterator): Decoded text chunks; empty strings mean no new data yet
             
-        self.content_lines = formatted_content.split('\n')
+        Returns:
+            str or None: "NAVIGATE" if the user left the page before it finished,
+                or the page moved to in the history has to be fetched
+        """
+        self.page_url = self.current_url
+        self.lazy_page = None
+        self.content_lines = LineStore()
         self.links = []
         self.link_positions = {}
-        
-        # Extract links from the formatted content
-        import re
-        link_pattern = r'\[(.*?)\]\((https?://[^\s\)]+)\)'
-        for i, line in enumerate(self.content_lines):
-            for match in re.finditer(link_pattern, line):
-                link_text, href = match.groups()
-                self.links.append((link_text, href))
-                self.link_positions[i] = (link_text, href)
-                
         self.cursor_y = 0
         self.scroll_pos = 0
+        self.link_line = -1
+        self.index_page()
+        stream = parser.LineStream(base_url=self.current_url)
+        body = []
+        
+        complete = True
+        error = None
+        self.set_delay(self.screen, 0)
+        try:
+            for text in chunks:
+                if text:
+                    body.append(text)
+                    self.append_lines(stream.feed(text))
+                if self.loading is not None:
+                    self.show_progress()
+                action = self.poll_input()
+                if action == "NAVIGATE":
+                    chunks.close()
+                    return "NAVIGATE"
+                elif action == "CANCELLED":
+                    chunks.close()
+                    complete = False
+                    break
+        except fetcher.DownloadError as e:
+            logger.error(f"Downloading {self.current_url} failed: {e}")
+            complete = False
+            error = e
+        finally:
+            self.set_delay(self.screen, -1)
+            self.loading = None
+        self.append_lines(stream.close())
+            
+        if not body:
+            self.append_lines(parser.parse_lines(""))
+        if complete:  # Never cache a partial page
+            key = pagecache.pageKey(''.join(body), self.current_url)
+            pagecache.cache.put(key, self.content_lines, self.links, self.link_positions)
+        self.update_search()
+        self.record_history()
+        self.show_address()
+        if error is not None:
+            self.show_error("The download broke off. Showing the part received so far.")
+        self.refresh_display()
+        self.prefetch_links()
+        if self.take_history_step("CANCELLED") == "NAVIGATE":
+            return "NAVIGATE"
+        
+    def record_history(self):
+        """Add the page just displayed to the history.
+        
+        A page refetched by a back/forward move updates its existing entry
+        and gets its old scroll position back instead.
+        """
+        move = self.history_move
+        self.history_move = None
+        if move is not None and move[0] is self.history.current and move[0].url == self.current_url:
+            entry = move[0]
+            self.ensure_lines(entry.scroll_pos + num_rows - 2)
+            self.history.store(self.content_lines, self.link_positions)
+            self.restore_position(entry)
+        else:
+            self.history.visit(self.current_url, self.content_lines, self.link_positions)
+            
+    def go_history(self, step):
+        """Go back (step -1) or forward (step 1) in the history.
+        
+        Pages with a snapshot are restored in place, including their scroll
+        position. Pages whose snapshot was evicted have to be fetched again.
+        
+        A move requested while a page is loading waits until the load has
+        stopped, so the page it leaves is settled in the history first.
+        
+        Returns:
+            bool: True if the page has to be fetched, or the load stopped
+        """
+        if self.loading is not None:
+            self.history_step = step
+            return True
+        self.save_position()
+        entry = self.history.back() if step < 0 else self.history.forward()
+        if entry is None:
+            return False
+        self.current_url = entry.url
+        if entry.snapshot is None:
+            self.history_move = (entry, step)
+            return True
+            
+        self.show_snapshot(entry)
+        return False
+        
+    def show_snapshot(self, entry):
+        """Bring back the page of a history entry from its snapshot, at its old position."""
+        self.content_lines, self.links, self.link_positions = entry.snapshot.restore()
+        self.lazy_page = None
+        self.link_line = -1
+        self.index_page()
+        self.page_url = entry.url
+        self.restore_position(entry)
+        self.show_address()
+        self.prefetch_links()
+        
+    def restore_session(self):
+        """Bring back the history and the page of the last session.
+        
+        A current page saved with the session is shown straight from the
+        session file; otherwise it is fetched again and scrolled back to
+        where it was left.
+        
+        Returns:
+            bool: True if the current page is on screen
+        """
+        if not confvars.session_restore:
+            return False
+        saved = session.load()
+        if saved is None:
+            return False
+        entries, index, url = saved
+        self.history.replace(entries, index)
+        self.current_url = url
+        entry = self.history.current
+        if entry is None or entry.url != url:
+            return False
+        if entry.snapshot is None:
+            self.history_move = (entry, 0)  # Refetched like a back/forward move
+            return False
+        self.show_snapshot(entry)
         self.refresh_display()
+        return True
+        
+    def save_session(self):
+        """Write the history and the current page to the session file."""
+        if not confvars.session_restore:
+            return
+        page = None
+        if self.page_url:
+            self.save_position()
+            entry = self.history.current
+            parsing = self.lazy_page is not None and not self.lazy_page.done
+            if entry is not None and entry.url == self.page_url and not parsing:
+                page = (self.content_lines, self.link_positions)
+        session.save(self.history, self.page_url or self.current_url, page)
+        
+    def index_page(self):
+        """Start the find-in-page index of a new page, re-running the current search on it."""
+        self.search_index = SearchIndex(self.content_lines)
+        self.update_search()
+        
+    def update_search(self):
+        """Re-run the current search, e.g. after more of the page arrived."""
+        if self.last_search:
+            self.run_search(self.last_search, self.search_regex)
+            
+    def run_search(self, term, regex=False):
+        """Search the page and make the result the current search.
+        
+        With smart case on, the search respects case only if the term has
+        an uppercase letter.
+        
+        Returns:
+            str: Status to show, like "Match 1 of 3"
+        """
+        self.last_search = term
+        self.search_regex = regex
+        self.current_match = -1
+        case_sensitive = confvars.search_smart_case and is_case_sensitive(term, regex)
+        try:
+            self.search_matches = self.search_index.search(term, regex, case_sensitive)
+        except re.error:
+            self.last_search = ""
+            self.search_matches = []
+            return "Invalid pattern"
+        if not term:
+            return ""
+        if not self.search_matches:
+            return "No matches found"
+        return f"Match 1 of {len(self.search_matches)}"
+            
+    def ensure_lines(self, count=None):
+        """Parse a lazily parsed page up to ``count`` lines, or completely if None."""
+        page = self.lazy_page
+        if page is None:
+            return
+        if count is None:
+            page.finish()
+        else:
+            page.ensure(count)
+            
+    def append_lines(self, lines):
+        """Append parsed Line records, repainting if they land on screen."""
+        first = len(self.content_lines)
+        for i, line in enumerate(lines, first):
+            self.content_lines.append(line.text)
+            if line.links:
+                self.links.extend(line.links)
+                self.link_positions[i] = tuple(line.links)
+        if lines and self.row_at(first) < self.scroll_pos + num_rows - 2:
+            self.refresh_display()
+        
+    def prefetch_links(self):
+        """Prefetch the link under the cursor and the first visible links."""
+        if not prefetcher.enabled or self.loading is not None:
+            return
+        urls = []
+        current = self.current_link()
+        visible = (link for i in self.visible_lines() for link in self.link_positions.get(i, ()))
+        for link in ([current] if current is not None else []) + list(visible):
+            if len(urls) >= confvars.prefetch_links:
+                break
+            if link.href not in urls:
+                urls.append(link.href)
+        prefetcher.schedule(urls)
+        
+    def current_link(self):
+        """Return the selected Link on the cursor line, or None."""
+        line = self.cursor_line()
+        spans = self.link_positions.get(line)
+        if not spans:
+            return None
+        return spans[min(self.link_choice, len(spans) - 1)] if line == self.link_line else spans[0]
+        
+    def move_cursor(self, line):
+        """Put the cursor on a line, scrolling only if it is off screen."""
+        row = self.row_at(line)
+        height = num_rows - 2
+        if not self.scroll_pos <= row < self.scroll_pos + height:
+            self.scroll_pos = max(0, min(row, self.wrap_map().total(row + height) - height))
+        self.cursor_y = row - self.scroll_pos
+        
+    def cycle_link(self, step):
+        """Select the next (step 1) or previous (step -1) link.
+        
+        Moves along the links of the cursor line first, then on to the
+        nearest line with links in that direction.
+        """
+        line = self.cursor_line()
+        spans = self.link_positions.get(line, ())
+        choice = min(self.link_choice, len(spans) - 1) if line == self.link_line else 0
+        if spans and 0 <= choice + step < len(spans):
+            self.link_line, self.link_choice = line, choice + step
+            return
+        lines = range(line + 1, len(self.content_lines)) if step > 0 else range(line - 1, -1, -1)
+        for i in lines:
+            spans = self.link_positions.get(i)
+            if spans:
+                self.move_cursor(i)
+                self.link_line, self.link_choice = i, 0 if step > 0 else len(spans) - 1
+                return
+                
+    def hint_labels(self, count):
+        """Return ``count`` distinct labels: one letter each if there are enough, else two."""
+        keys = self.HINT_KEYS
+        if count <= len(keys):
+            return list(keys[:count])
+        return [a + b for a in keys for b in keys][:count]
+        
+    def choose_hint(self):
+        """Label every visible link and move the cursor to the one whose label is typed.
         
+        Any key that cannot continue a label cancels.
+        """
+        visible = [(i, k) for i in self.visible_lines() for k in range(len(self.link_positions.get(i, ())))]
+        if not visible:
+            return
+        self.hints = dict(zip(self.hint_labels(len(visible)), visible))
+        self.hint_prefix = ""
+        chosen = None
+        try:
+            while chosen is None:
+                self.refresh_display()
+                key = self.screen.getch()
+                if key == curses.KEY_RESIZE:
+                    curses.ungetch(key)  # Handled once the hints are gone
+                if not 0 <= key < 256 or chr(key) not in self.HINT_KEYS:
+                    break
+                self.hint_prefix += chr(key)
+                chosen = self.hints.get(self.hint_prefix)
+                if not any(label.startswith(self.hint_prefix) for label in self.hints):
+                    break
+        finally:
+            self.hints = None
+            self.hint_prefix = ""
+        if chosen is not None:
+            self.move_cursor(chosen[0])
+            self.link_line, self.link_choice = chosen
+            
     def follow_link(self):
         """Follow link at cursor position"""
-        current_line = self.scroll_pos + self.cursor_y
-        if current_line in self.link_positions:
-            link_text, href = self.link_positions[current_line]
+        link = self.current_link()
+        if link is not None:
+            href = link.href
             self.current_url = href
             # Show the URL being followed
             self.address_bar.clear()
@@ -174,9 +657,21 @@ class TUI:
             return new_url
         return None
 
-    def get_user_input(self, prompt="", prefill=""):
-        """Get user input with optional prefilled text"""
-        self.address_bar.clear()
+    def get_user_input(self, prompt="", prefill="", on_change=None, debounce=0):
+        """Get user input with optional prefilled text
+        
+        Args:
+            prompt (str): Text shown before the input
+            prefill (str): Initial input, also returned when Esc is pressed
+            on_change (callable): Called as on_change(text, key) after every key
+                but Enter and Esc; returns the (prompt, status) to show
+            debounce (int): Milliseconds without typing before on_change is called
+            
+        Returns:
+            str: The text entered
+        """
+        status = ""
+        self.address_bar.erase()
         self.address_bar.addstr(0, 0, prompt + prefill)
         self.address_bar.refresh()
         
@@ -214,11 +709,20 @@ class TUI:
                 elif 32 <= c <= 126:  # Printable characters
                     input_buffer.insert(cursor_pos, chr(c))
                     cursor_pos += 1
+                elif c == curses.KEY_RESIZE:
+                    self.resize()
+                    
+                if on_change is not None and c != curses.KEY_RESIZE and not (debounce and self.key_pending(debounce)):
+                    prompt, status = on_change(''.join(input_buffer), c)
+                    prompt_len = len(prompt)
                 
-                # Redraw input line
-                self.address_bar.clear()
-                self.address_bar.addstr(0, 0, prompt + ''.join(input_buffer))
-                self.address_bar.move(0, prompt_len + cursor_pos)
+                # Redraw input line, with the status on the right
+                text = prompt + ''.join(input_buffer)
+                if status and len(status) + 3 < num_cols:
+                    text = f"{text[:num_cols - len(status) - 3]:<{num_cols - len(status) - 2}}{status}"
+                self.address_bar.erase()
+                self.address_bar.addstr(0, 0, text[:num_cols - 1])
+                self.address_bar.move(0, min(prompt_len + cursor_pos, num_cols - 1))
                 self.address_bar.refresh()
                 
             except curses.error:
@@ -227,6 +731,37 @@ class TUI:
         curses.noecho()
         return ''.join(input_buffer)
 
+    def set_delay(self, win, delay):
+        """Set how long getch() on a window waits for a key, remembering it for key_pending().
+        
+        Args:
+            win: Window to set the delay of
+            delay (int): Milliseconds to wait, 0 for not at all, -1 for ever
+        """
+        self.delays[win] = delay
+        win.timeout(delay)
+        
+    def key_pending(self, delay, win=None):
+        """Wait up to ``delay`` milliseconds for a key, leaving it unread.
+        
+        Args:
+            delay (int): Milliseconds to wait
+            win: Window to read from, the address bar by default
+            
+        Returns:
+            bool: True if a key arrived
+        """
+        win = win or self.address_bar
+        win.timeout(delay)
+        try:
+            key = win.getch()
+        finally:
+            win.timeout(self.delays.get(win, -1))  # As it was, e.g. non-blocking while loading
+        if key == -1:
+            return False
+        curses.ungetch(key)
+        return True
+        
     def get_yes_no(self, prompt):
         """Get a yes/no response from the user"""
         while True:
@@ -239,6 +774,7 @@ class TUI:
     def handle_ssl_error(self):
         """Handle SSL certificate errors"""
         self.content_win.clear()
+        self.invalidate_display()
         warning = [
             "⚠️  SSL Certificate Error ⚠️",
             "",
@@ -268,6 +804,7 @@ class TUI:
     def handle_http_error(self, status, reason, error_content):
         """Handle HTTP error responses"""
         self.content_win.clear()
+        self.invalidate_display()
         
         # Get error description
         error_desc = {
@@ -325,39 +862,201 @@ class TUI:
             return self.show_url_bar()
         return self.current_url
 
+    def position_text(self):
+        """Return the cursor line and line count, marked with + while still parsing."""
+        total = len(self.content_lines)
+        more = "+" if self.lazy_page is not None and not self.lazy_page.done else ""
+        return f"{min(self.cursor_line() + 1, total)}/{total}{more}"
+        
+    def update_position(self):
+        """Redraw the address bar if the position indicator changed."""
+        if self.page_url and self.position_text() != self.shown_position:
+            self.show_address()
+            
+    def show_address(self):
+        """Show the current URL in the address bar, with the position and prefetch statistics."""
+        text = self.current_url
+        stats = ""
+        if self.page_url:
+            self.shown_position = self.position_text()
+            stats = self.shown_position
+        if prefetcher.enabled and prefetcher.stats["scheduled"]:
+            stats = f"prefetch hits {prefetcher.hitRate():.0%}  {stats}"
+        if stats and len(stats) + 3 < num_cols:
+            text = f"{text[:num_cols - len(stats) - 3]:<{num_cols - len(stats) - 2}}{stats}"
+        self.address_bar.erase()
+        self.put(self.address_bar, 0, 0, text[:num_cols - 1])
+        self.address_bar.refresh()
+        
+    def show_progress(self):
+        """Show the progress of the current load in the address bar."""
+        load = self.loading
+        text = f"Loading {load.url} ... {load.bytes_received / 1024:.1f} KB (Esc to cancel)"
+        self.address_bar.clear()
+        try:
+            self.address_bar.addstr(0, 0, text[:num_cols - 1])
+        except curses.error:
+            pass
+        self.address_bar.refresh()
+        
+    def poll_input(self):
+        """Handle a pending key, if any, while a page is loading.
+        
+        Returns:
+            str or None: "CANCELLED" if Esc was pressed, "NAVIGATE" if another
+                page or quitting was requested, None otherwise
+        """
+        key = self.screen.getch()
+        if key == -1:
+            return None
+        if key == 27:  # Escape
+            return "CANCELLED"
+        curses.ungetch(key)
+        if not self.handle_input():
+            # A back/forward move stops the load as Esc does, then moves from the page on screen
+            return "CANCELLED" if self.history_step is not None else "NAVIGATE"
+        return None
+        
+    def wait_for(self, load):
+        """Wait for a background load while keeping the current page usable.
+        
+        Args:
+            load (PageLoad): Load to wait for
+            
+        Returns:
+            Fetch result (a chunk iterator for streamed pages), or
+            "CANCELLED"/"NAVIGATE" if the user interrupted the load
+        """
+        self.loading = load
+        streaming = False
+        self.set_delay(self.screen, 0)
+        try:
+            while True:
+                message = load.poll()
+                if message is not None:
+                    kind, result, error = message
+                    if kind == "stream":
+                        streaming = True
+                        return load.chunks()
+                    if error is not None:
+                        logger.error(f"Fetching {load.url} failed: {error}")
+                    return result
+                self.show_progress()
+                action = self.poll_input()
+                if action:
+                    load.cancel()
+                    return action
+        finally:
+            self.set_delay(self.screen, -1)
+            if not streaming:  # stream_html keeps showing progress
+                self.loading = None
+        
+    def load_interrupted(self, action):
+        """Handle a load interrupted by the user.
+        
+        Args:
+            action (str): "CANCELLED" or "NAVIGATE", as returned by poll_input
+            
+        Returns:
+            str or None: The action, or None if a cancelled load leaves no page to show
+        """
+        if action == "CANCELLED":
+            self.current_url = self.page_url  # Stay on the current page
+            self.undo_history_move()
+            if not self.page_url:
+                return None
+            self.show_address()
+        return action
+        
+    def take_history_step(self, action):
+        """Make the back/forward move requested while a page was loading, now that it stopped.
+        
+        Args:
+            action (str or None): What the interrupted load returns without a move
+            
+        Returns:
+            str or None: "NAVIGATE" if the page moved to has to be fetched, action otherwise
+        """
+        step = self.history_step
+        self.history_step = None
+        if step is None or action is None:
+            return action
+        return "NAVIGATE" if self.go_history(step) else action
+        
+    def undo_history_move(self):
+        """Point the history back at the page on screen after a back/forward refetch failed."""
+        if self.history_move is None:
+            return
+        _, step = self.history_move
+        self.history_move = None
+        if step > 0:
+            self.history.back()
+        elif step < 0:
+            self.history.forward()
+            
     def fetch_url(self, url):
-        """Fetch content from URL with error handling"""
-        import fetcher
+        """Fetch content from URL with error handling.
+        
+        The fetch runs in a background thread. Meanwhile the current page
+        stays scrollable, the address bar shows the bytes received, and Esc
+        cancels the load.
         
-        content = fetcher.fetcher(url)
+        Returns:
+            Page content, None on failure, or "CANCELLED"/"NAVIGATE" if the
+            user interrupted the load
+        """
+        if self.history_move is None:
+            self.save_position()
+        timing.startPage(url)
+            
+        # Links prefetched from the previous page render without a network wait
+        prefetcher.cancel()
+        content = prefetcher.take(url)
         
+        # Only html.parser can be fed a page while it downloads; other backends parse it whole
+        streaming = confvars.streaming and parser.get_backend() is parser.get_backend(parser.DEFAULT_BACKEND)
+        fetch = fetcher.streamer if streaming else fetcher.fetcher
         if content is None:
+            content = self.wait_for(PageLoad(timing.bind(fetch), url))
+        
+        if content in ("CANCELLED", "NAVIGATE"):
+            return self.take_history_step(self.load_interrupted(content))
+        elif content is None:
             self.show_error("Failed to fetch page. The host may not exist or your internet connection may be down.")
-            self.current_url = ""  # Reset URL so user can enter a new one
-            return None
+            return self.fetch_failed()
         elif content == "SSLERR":
             if not self.handle_ssl_error():
-                self.current_url = ""
-                return None
+                return self.fetch_failed()
             # Retry with SSL verification disabled
-            content = fetcher.fetcher(url, verify=False)
+            content = self.wait_for(PageLoad(timing.bind(fetch), url, verify=False))
+            if content in ("CANCELLED", "NAVIGATE"):
+                return self.take_history_step(self.load_interrupted(content))
             if content == "SSLERR":
                 self.show_error("SSL Error persists. Cannot load page.")
-                self.current_url = ""  # Reset URL so user can enter a new one
-                return None
+                return self.fetch_failed()
         elif isinstance(content, tuple) and content[0] == "ERROR":
             _, status, reason, error_content = content
             if not self.handle_http_error(status, reason, error_content):
-                self.current_url = ""  # Reset URL so user can enter a new one
-                return None
+                return self.fetch_failed()
             # User wants to retry
             return self.fetch_url(url)
             
         return content
 
+    def fetch_failed(self):
+        """Give up on a page that could not be fetched.
+        
+        Returns:
+            None, as fetch_url() does on failure
+        """
+        self.current_url = ""  # Reset URL so user can enter a new one
+        self.undo_history_move()
+        return None
+
     def show_error(self, message):
         """Show an error message in the content window"""
         self.content_win.clear()
+        self.invalidate_display()
         try:
             self.content_win.addstr(1, 2, "Error:", curses.A_BOLD)
             self.content_win.addstr(1, 9, f" {message}")
@@ -376,33 +1075,54 @@ class TUI:
                 pass
         
         self.content_win.clear()
+        self.invalidate_display()
         self.content_win.refresh()
 
     def search_content(self):
-        """Search content in the current page"""
-        search_term = self.get_user_input("Search: ")
+        """Search content in the current page
+        
+        Matches are updated and highlighted while the term is typed. ^R
+        toggles regex mode. Esc, or an empty term, brings back the previous
+        search and position.
+        """
+        previous = (self.last_search, self.search_regex, self.scroll_pos, self.cursor_y)
+        regex = confvars.search_regex
+        self.ensure_lines()
+        # Large pages are only searched when typing pauses
+        debounce = self.SEARCH_DEBOUNCE if len(self.content_lines) >= confvars.search_debounce_lines else 0
+        
+        def search_prompt():
+            return "Search (regex): " if regex else "Search: "
+            
+        def on_change(term, key):
+            nonlocal regex
+            if key == 18:  # ^R
+                regex = not regex
+            status = self.run_search(term, regex)
+            if self.search_matches:
+                self.jump_to_match(0, announce=False)
+            else:
+                self.scroll_pos, self.cursor_y = previous[2:]
+                self.refresh_display()
+            return (search_prompt(), status)
+            
+        search_term = self.get_user_input(search_prompt(), on_change=on_change, debounce=debounce)
         if not search_term:
+            self.run_search(previous[0], previous[1])
+            self.scroll_pos, self.cursor_y = previous[2:]
+            self.show_address()
+            self.refresh_display()
             return
-        if search_term == "":
-            return
-        self.last_search = search_term.lower()
-        self.search_matches = []
-        self.current_match = -1
-        
-        # Find all matches
-        for i, line in enumerate(self.content_lines):
-            if self.last_search in line.lower():
-                self.search_matches.append(i)
-                
+        status = self.run_search(search_term, regex)
         if self.search_matches:
             self.jump_to_match(0)
         else:
             self.address_bar.clear()
-            self.address_bar.addstr(0, 0, "No matches found")
+            self.address_bar.addstr(0, 0, status)
             self.address_bar.refresh()
             
-    def jump_to_match(self, match_index):
-        """Jump to a specific match by index"""
+    def jump_to_match(self, match_index, announce=True):
+        """Jump to a specific match by index, showing "Match x of y" if announce is set"""
         if not self.search_matches:
             return
             
@@ -411,13 +1131,16 @@ class TUI:
         line_num = self.search_matches[self.current_match]
         
         # Update display
-        self.scroll_pos = max(0, min(line_num, len(self.content_lines) - (num_rows - 2)))
-        self.cursor_y = line_num - self.scroll_pos
+        row = self.row_at(line_num)
+        height = num_rows - 2
+        self.scroll_pos = max(0, min(row, self.wrap_map().total(row + height) - height))
+        self.cursor_y = row - self.scroll_pos
         
         # Show match position
-        self.address_bar.clear()
-        self.address_bar.addstr(0, 0, f"Match {self.current_match + 1} of {len(self.search_matches)}")
-        self.address_bar.refresh()
+        if announce:
+            self.address_bar.clear()
+            self.address_bar.addstr(0, 0, f"Match {self.current_match + 1} of {len(self.search_matches)}")
+            self.address_bar.refresh()
         
         self.refresh_display()
         
@@ -431,76 +1154,65 @@ class TUI:
         if self.search_matches:
             self.jump_to_match(self.current_match - 1)
         
+    def invalidate_display(self):
+        """Forget what the content window shows, so the next refresh repaints it all."""
+        self.drawn_rows = None  # Per row: (line index, row of the line, cursor state, search, hints) or None if blank
+        self.drawn_page = None
+        self.drawn_scroll = 0
+        
+    @timing.timed("draw")
     def refresh_display(self):
-        """Refresh the display with current content."""
+        """Refresh the display with current content.
+        
+        Long lines are wrapped to the window width. Only rows whose line,
+        cursor state or search term changed since the last refresh are
+        repainted, so moving the cursor redraws two rows. A scroll by less
+        than a screenful shifts the window with scroll() and draws the new
+        rows.
+        """
         try:
-            self.content_win.clear()
-            
-            # Calculate visible range
+            # Calculate visible range. Long pages are parsed at least one line
+            # beyond it, so scrolling down can always continue
+            self.ensure_lines(self.scroll_pos + num_rows - 1 + confvars.lazy_parse_lookahead)
             start = self.scroll_pos
-            end = min(start + num_rows - 2, len(self.content_lines))
+            height = num_rows - 2
+            count = len(self.content_lines)
+            wrap = self.wrap_map()
+            cursor_line = wrap.line_at(start + self.cursor_y)[0]
             
-            # Display each line
-            for i in range(start, end):
-                y = i - start
-                line = self.content_lines[i]
-                
-                # Handle links and search matches
-                if i in self.link_positions:
-                    link_text, _ = self.link_positions[i]
-                    # Split line into parts: before link, link, after link
-                    link_start = line.find(link_text)
-                    if link_start != -1:
-                        # Show parts before link
-                        if link_start > 0:
-                            self.content_win.addstr(y, 0, line[:link_start])
-                            
-                        # Show link with highlighting
-                        attr = curses.A_REVERSE if y == self.cursor_y else curses.A_UNDERLINE
-                        self.content_win.addstr(y, link_start, link_text, attr)
-                        
-                        # Show parts after link
-                        after_link = link_start + len(link_text)
-                        if after_link < len(line):
-                            self.content_win.addstr(y, after_link, line[after_link:])
-                    else:
-                        # Fallback if link text not found
-                        self.content_win.addstr(y, 0, line)
-                        
-                # Handle search highlights
-                elif self.last_search and self.last_search in line.lower():
-                    # Split line into segments based on matches
-                    segments = []
-                    last_end = 0
-                    search_lower = self.last_search.lower()
-                    line_lower = line.lower()
-                    
-                    while True:
-                        pos = line_lower.find(search_lower, last_end)
-                        if pos == -1:
-                            segments.append((line[last_end:], False))
-                            break
-                        if pos > last_end:
-                            segments.append((line[last_end:pos], False))
-                        segments.append((line[pos:pos+len(search_lower)], True))
-                        last_end = pos + len(search_lower)
-                    
-                    # Display segments with appropriate highlighting
-                    x = 0
-                    for text, is_match in segments:
-                        attr = curses.A_REVERSE if is_match else curses.A_NORMAL
-                        try:
-                            self.content_win.addstr(y, x, text, attr)
-                            x += len(text)
-                        except curses.error:
-                            pass
-                else:
-                    # Regular line
-                    try:
-                        attr = curses.A_REVERSE if y == self.cursor_y else curses.A_NORMAL
-                        self.content_win.addstr(y, 0, line, attr)
-                    except curses.error:
-                        pass
+            drawn = self.drawn_rows
+            delta = start - self.drawn_scroll
+            if drawn is None or self.drawn_page is not self.content_lines or len(drawn) != height:
+                self.content_win.erase()
+                drawn = [None] * height
+            elif 0 < abs(delta) < height:
+                self.content_win.scrollok(True)
+                self.content_win.scroll(delta)
+                self.content_win.scrollok(False)
+                drawn = drawn[delta:] + [None] * delta if delta > 0 else [None] * -delta + drawn[:delta]
+            
+            # Repaint the rows that changed
+            i, k = wrap.line_at(start)
+            hints = self.hint_prefix if self.hints is not None else None
+            for y in range(height):
+                state = None
+                if i < count:
+                    cursor = None
+                    if i == cursor_line and i in self.link_positions:
+                        cursor = self.link_choice if i == self.link_line else 0
+                    state = (i, k, y == self.cursor_y, cursor, self.last_search, self.search_regex, hints)
+                if drawn[y] != state:
+                    self.content_win.move(y, 0)
+                    self.content_win.clrtoeol()
+                    if state is not None:
+                        self.draw_line(y, i, k, cursor is not None)
+                    drawn[y] = state
+                k += 1
+                if i >= count or k == wrap.rows(i):
+                    i, k = i + 1, 0
+            self.drawn_rows = drawn
+            self.drawn_page = self.content_lines
+            self.drawn_scroll = start
                         
             # Show controls
             self.show_controls()
@@ -511,11 +1223,78 @@ class TUI:
         except curses.error:
             pass
             
+    def draw_line(self, y, i, row=0, on_cursor_line=False):
+        """Draw one row of content line ``i``, as wrapped, on row ``y`` of the content window.
+        
+        Args:
+            y (int): Row of the content window
+            i (int): Line number
+            row (int): Which row of the wrapped line to draw
+            on_cursor_line (bool): Whether the cursor is on the line, selecting a link
+        """
+        line = self.content_lines[i]
+        pieces = []  # (column, text, attribute) making up the line
+        
+        # Handle links and search matches
+        spans = self.link_positions.get(i)
+        if spans:
+            selected = -1
+            if on_cursor_line:
+                selected = min(self.link_choice, len(spans) - 1) if i == self.link_line else 0
+            x = 0
+            for k, link in enumerate(spans):
+                # Show the text before the link, then the link with highlighting
+                pieces.append((x, line[x:link.start], curses.A_NORMAL))
+                attr = curses.A_REVERSE if k == selected else curses.A_UNDERLINE
+                pieces.append((link.start, line[link.start:link.end], attr))
+                x = link.end
+            pieces.append((x, line[x:], curses.A_NORMAL))
+            
+            # Label the links while a hint is being typed
+            if self.hints is not None:
+                for label, (line_num, k) in self.hints.items():
+                    if line_num == i and label.startswith(self.hint_prefix):
+                        pieces.append((spans[k].start, label, curses.A_REVERSE | curses.A_BOLD))
+                
+        # Handle search highlights, using the columns found by the search index
+        elif self.last_search and self.search_index.spans(i):
+            x = 0
+            for start, end in self.search_index.spans(i):
+                pieces.append((x, line[x:start], curses.A_NORMAL))
+                pieces.append((start, line[start:end], curses.A_REVERSE))
+                x = end
+            pieces.append((x, line[x:], curses.A_NORMAL))
+        else:
+            # Regular line
+            attr = curses.A_REVERSE if y == self.cursor_y else curses.A_NORMAL
+            pieces.append((0, line, attr))
+            
+        # Show the part of each piece within the columns of this row
+        left = row * num_cols
+        for x, text, attr in pieces:
+            if x < left:
+                text = text[left - x:]
+                x = left
+            self.put(self.content_win, y, x - left, text, attr)
+            
+    def put(self, win, y, x, text, attr=curses.A_NORMAL):
+        """Write text clipped to the window width, counting the bytes drawn."""
+        text = text[:num_cols - x]
+        if not text:
+            return
+        redraw_stats["bytes"] += len(text.encode('utf-8'))
+        try:
+            win.addstr(y, x, text, attr)
+        except curses.error:
+            pass  # Writing the bottom-right cell moves the cursor off the window
+            
     def _key_to_readable(self, key):
         """Convert control characters to readable format"""
         if len(key) == 1:
             if key == '\x1B':
                 return 'M-'
+            if key == '\t':
+                return 'Tab'
             if ord(key) < 32:
                 return f'^{chr(ord(key) + 64)}'
             return key
@@ -525,6 +1304,12 @@ class TUI:
             return '↑'
         elif key == 'KEY_DOWN':
             return '↓'
+        elif key == 'KEY_LEFT':
+            return '←'
+        elif key == 'KEY_RIGHT':
+            return '→'
+        elif key == 'KEY_BTAB':
+            return 'S-Tab'
         elif key == 'KEY_PPAGE':
             return 'PgUp'
         elif key == 'KEY_NPAGE':
@@ -532,7 +1317,14 @@ class TUI:
         return key
 
     def show_controls(self):
-        """Display current control scheme at the bottom."""
+        """Display current control scheme at the bottom.
+        
+        The bar is only drawn again when the keymap, the terminal width or the
+        timings overlay changed.
+        """
+        overlay = self.timings_text() if self.show_timings else None
+        if self.controls_drawn == (self.controls_map, num_cols, overlay):
+            return
         try:
             up = self._key_to_readable(self.controls_map['up'])
             down = self._key_to_readable(self.controls_map['down'])
@@ -541,6 +1333,12 @@ class TUI:
             term = self._key_to_readable(self.controls_map['show_terminal'])
             find = self._key_to_readable(self.controls_map['find'])
             open_url = self._key_to_readable(self.controls_map['open_url'])
+            back = self._key_to_readable(self.controls_map['back'])
+            forward = self._key_to_readable(self.controls_map['forward'])
+            next_link = self._key_to_readable(self.controls_map['next_link'])
+            prev_link = self._key_to_readable(self.controls_map['prev_link'])
+            hints = self._key_to_readable(self.controls_map['hints'])
+            perf = self._key_to_readable(self.controls_map['timings'])
             
             controls = [
                 f"UP: {up}",
@@ -550,20 +1348,49 @@ class TUI:
                 f"TERM: {term}",
                 f"FIND: {find}",
                 f"OPEN: {open_url}",
+                f"BACK: {back}",
+                f"FWD: {forward}",
+                f"LINK: {next_link}/{prev_link}",
+                f"HINTS: {hints}",
+                f"PERF: {perf}",
                 "n: Next match",
                 "N: Prev match"
             ]
             
-            controls_text = " | ".join(controls)
-            self.controls.clear()
+            controls_text = " | ".join(controls) if overlay is None else overlay
+            self.controls.erase()
             # Leave one character space at the end to prevent cursor wrapping
             max_length = num_cols - 1
             if len(controls_text) > max_length:
                 controls_text = controls_text[:max_length - 3] + "..."
-            self.controls.addstr(0, 0, controls_text)
+            self.put(self.controls, 0, 0, controls_text)
             self.controls.refresh()
+            self.controls_drawn = (self.controls_map, num_cols, overlay)
         except curses.error:
             pass
+            
+    def timings_text(self):
+        """Describe the phase timings of the last page for the controls bar."""
+        page = timing.last_page
+        if page is None:
+            return "PERF: no page timed yet, load one"
+        loading = "" if page.finished else " (loading)"
+        return f"PERF{loading} {page.summary()}"
+        
+    def toggle_timings(self):
+        """Show or hide the last page's phase timings in the controls bar.
+        
+        Timing is switched on while the overlay is shown, so the next page
+        is measured even if perf_spans is off.
+        """
+        self.show_timings = not self.show_timings
+        timing.enabled = self.show_timings or confvars.perf_spans
+        self.show_controls()
+        
+    def finish_timing(self):
+        """Log the phase timings of the page just displayed."""
+        if timing.finishPage() is not None and self.show_timings:
+            self.show_controls()
 
     def show_terminal(self):
         """Temporarily show the terminal by suspending curses"""
@@ -574,16 +1401,29 @@ class TUI:
         input("\nPress Enter to return to the browser...")
         # Restore previous screen content
         os.system('tput rmcup')
-        # Reinitialize the screen
-        self.init_windows()
+        # Return to the screen, at the terminal's size now
+        rows, cols = os.get_terminal_size()
+        if curses.is_term_resized(rows, cols):
+            curses.resizeterm(rows, cols)
+        self.screen.refresh()
+        self.invalidate_display()
+        self.resize()
         self.refresh_display()
 
     def handle_input(self):
         """Handle user input based on current control scheme."""
         try:
+            # Wake up regularly while a long page is parsed, to update its line count.
+            # A page load polls for keys without waiting, so its delay is left alone.
+            if self.loading is None:
+                filling = self.lazy_page is not None and not self.lazy_page.done
+                self.set_delay(self.screen, 250 if filling else -1)
             key = self.screen.getch()
             if key == -1:
+                self.update_position()
                 return True
+            redraw_stats["keys"] += 1
+            drawn_before = redraw_stats["bytes"]
                     
             # Convert key to string representation for comparison
             key_str = chr(key) if key < 256 else curses.keyname(key).decode('utf-8')
@@ -606,6 +1446,7 @@ class TUI:
             elif key_str == '\x1b':  # Escape key
                 # Clear search highlights
                 self.last_search = ""
+                self.search_regex = False
                 self.search_matches = []
                 self.current_match = -1
                 self.refresh_display()
@@ -618,6 +1459,20 @@ class TUI:
                 url = self.follow_link()
                 if url:
                     return False  # Exit input loop to load new URL
+            elif key_str == self.controls_map['next_link']:
+                self.cycle_link(1)
+            elif key_str == self.controls_map['prev_link']:
+                self.cycle_link(-1)
+            elif key_str == self.controls_map['hints']:
+                self.choose_hint()
+            elif key_str == self.controls_map['timings']:
+                self.toggle_timings()
+            elif key_str == self.controls_map['back']:
+                if self.go_history(-1):
+                    return False  # Exit input loop to fetch the page again
+            elif key_str == self.controls_map['forward']:
+                if self.go_history(1):
+                    return False  # Exit input loop to fetch the page again
             elif key_str in (self.controls_map['up'], 'KEY_UP'):
                 if self.search_matches and key_str == self.controls_map['up']:
                     self.find_previous()  # Use up key for previous match in vim mode
@@ -629,15 +1484,21 @@ class TUI:
                 if self.search_matches and key_str == self.controls_map['down']:
                     self.find_next()  # Use down key for next match in vim mode
                 else:
-                    max_y = min(num_rows - 3, len(self.content_lines) - 1)
+                    total = self.wrap_map().total(self.scroll_pos + num_rows)
+                    max_y = min(num_rows - 3, total - 1)
                     self.cursor_y = min(max_y, self.cursor_y + 1)
                     if self.cursor_y > max_y - 2:  # Keep cursor in view
-                        if self.scroll_pos + num_rows - 2 < len(self.content_lines):
+                        if self.scroll_pos + num_rows - 2 < total:
                             self.scroll_pos += 1
             elif key_str == self.controls_map['show_terminal']:
                 self.show_terminal()
+            elif key == curses.KEY_RESIZE:
+                self.resize()
                 
             self.refresh_display()
+            self.update_position()
+            redraw_stats["last_key_bytes"] = redraw_stats["bytes"] - drawn_before
+            self.prefetch_links()
             return not self.should_quit
             
         except curses.error:
@@ -651,7 +1512,13 @@ VIM_CONTROLS = {
     'follow_link': 'f',
     'show_terminal': 't',
     'find': '/',  
-    'open_url': 'o'
+    'open_url': 'o',
+    'back': 'H',
+    'forward': 'L',
+    'next_link': 'l',
+    'prev_link': 'h',
+    'hints': 'F',
+    'timings': 'p'
 }
 
 NANO_CONTROLS = {
@@ -661,7 +1528,13 @@ NANO_CONTROLS = {
     'follow_link': '\x06',  
     'show_terminal': '\x14',  
     'find': '\x17',  
-    'open_url': '\x0F'
+    'open_url': '\x0F',
+    'back': 'KEY_LEFT',
+    'forward': 'KEY_RIGHT',
+    'next_link': '\t',
+    'prev_link': 'KEY_BTAB',
+    'hints': '\x0B',
+    'timings': '\x07'
 }
 
 EMACS_CONTROLS = {
@@ -671,5 +1544,11 @@ EMACS_CONTROLS = {
     'follow_link': '\x0A',  
     'show_terminal': '\x1A',  
     'find': '\x13',
-    'open_url': '\x0F'
+    'open_url': '\x0F',
+    'back': '\x02',
+    'forward': '\x06',
+    'next_link': '\t',
+    'prev_link': 'KEY_BTAB',
+    'hints': '\x0B',
+    'timings': '\x07'
 }
@@ -0,0 +1,88 @@
+"""
+Soft-wrap module for SPyB.
+Lays out the lines of a page as the rows they take at a given width, so a
+terminal resize reflows the page without parsing it again.
+"""
+
+# Standard library imports
+from array import array
+from bisect import bisect_right
+
+class WrapMap:
+    """Row layout of a page's lines at one width.
+
+    A line of n characters takes max(1, ceil(n / width)) rows, and row k of
+    a line shows its columns k * width to (k + 1) * width. ``ends[i]`` is
+    the number of rows taken by lines 0 to i.
+
+    Lines are only measured as far as rows or lines are asked for, so a
+    huge page is measured where it is viewed. The page may keep growing
+    (streamed or lazily parsed pages); lines past its end count as one row
+    each.
+    """
+
+    # Lines measured at a time
+    BLOCK_LINES = 1024
+
+    def __init__(self, lines, width):
+        self.lines = lines
+        self.width = max(1, width)
+        self.ends = array('I')  # Rows up to and including each measured line
+
+    def _extend(self):
+        """Measure the next block of lines.
+
+        Returns:
+            bool: False if every line is measured already
+        """
+        ends = self.ends
+        first = len(ends)
+        last = min(first + self.BLOCK_LINES, len(self.lines))
+        if first >= last:
+            return False
+        width = self.width
+        total = ends[-1] if first else 0
+        for line in self.lines[first:last]:
+            total += max(1, -(-len(line) // width))
+            ends.append(total)
+        return True
+
+    def row_of(self, i):
+        """Return the first row of line ``i``."""
+        while len(self.ends) < i and self._extend():
+            pass
+        measured = len(self.ends)
+        if i > measured:
+            return (self.ends[-1] if measured else 0) + i - measured
+        return self.ends[i - 1] if i else 0
+
+    def rows(self, i):
+        """Return the number of rows line ``i`` takes."""
+        return self.row_of(i + 1) - self.row_of(i)
+
+    def line_at(self, row):
+        """Return the line shown on a row and which of its rows it is.
+
+        Returns:
+            tuple: (line number, row within the line)
+        """
+        while (not self.ends or self.ends[-1] <= row) and self._extend():
+            pass
+        i = bisect_right(self.ends, row)
+        if i == len(self.ends):
+            return i + row - self.row_of(i), 0
+        return i, row - (self.ends[i - 1] if i else 0)
+
+    def total(self, at_least=None):
+        """Return the number of rows of the page.
+
+        Args:
+            at_least (int): Stop measuring once the page is known to have
+                this many rows; the result is then only a lower bound
+
+        Returns:
+            int: Rows taken by the lines measured
+        """
+        while (at_least is None or not self.ends or self.ends[-1] < at_least) and self._extend():
+            pass
+        return self.ends[-1] if self.ends else 0
@@ -0,0 +1,11 @@
+"""
+Test setup for SPyB.
+The modules live side by side in src/ and import each other by name, as
+when main.py is run from there.
+"""
+
+# Standard library imports
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
@@ -0,0 +1,67 @@
+"""
+Tests for streamed downloads in the fetcher and loader modules.
+"""
+
+# Standard library imports
+import time
+import threading
+import http.server
+
+# Third-party imports
+import pytest
+
+# Local imports
+import fetcher
+import httpcache
+from loader import PageLoad
+
+# Seconds a test waits for the fetch thread before failing
+TIMEOUT = 10
+
+class TruncatingHandler(http.server.BaseHTTPRequestHandler):
+    """Announces a longer body than it sends, then drops the connection."""
+
+    def do_GET(self):
+        body = b"<html><body>" + b"<p>partial</p>" * 5000
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body) * 2))
+        self.send_header("Cache-Control", "max-age=600")
+        self.end_headers()
+        self.wfile.write(body)
+        self.wfile.flush()
+        self.connection.close()
+
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture
+def url(tmp_path, monkeypatch):
+    monkeypatch.setattr(fetcher, "cache", httpcache.ResponseCache(tmp_path, 1 << 20))
+    httpd = http.server.ThreadingHTTPServer(("127.0.0.1", 0), TruncatingHandler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_port}/page"
+    httpd.shutdown()
+    httpd.server_close()
+    fetcher.closeSession()
+
+def test_broken_download_raises(url):
+    chunks = fetcher.streamer(url)
+    received = []
+    with pytest.raises(fetcher.DownloadError):
+        for text in chunks:
+            received.append(text)
+    assert "partial" in "".join(received)
+    assert fetcher.cache.lookup(url) is None  # The partial body is not cached
+
+def test_broken_download_reaches_the_ui_thread(url):
+    load = PageLoad(fetcher.streamer, url)
+    deadline = time.monotonic() + TIMEOUT
+    message = None
+    while message is None and time.monotonic() < deadline:
+        message = load.poll()
+    assert message is not None and message[0] == "stream"
+    with pytest.raises(fetcher.DownloadError):
+        for _ in load.chunks():
+            assert time.monotonic() < deadline, "The download never ended"
@@ -0,0 +1,139 @@
+"""
+Tests for the history module and the TUI's back/forward handling.
+"""
+
+# Third-party imports
+import pytest
+
+# Local imports
+import app_confvars as confvars
+import pagecache
+import parser
+import bench
+from history import History
+from linestore import LineStore
+from prefetch import prefetcher
+
+def link_page(count):
+    return "<html><body><ul>" + "".join(
+        f"<li><a href='/page/{i}'>Link {i}</a></li>" for i in range(count)
+    ) + "</ul></body></html>"
+
+@pytest.fixture
+def ui(monkeypatch):
+    monkeypatch.setattr(confvars, "lazy_parse_min_size", 1)  # Parse every page lazily
+    monkeypatch.setattr(prefetcher, "workers", 0)
+    monkeypatch.setattr(pagecache, "cache", pagecache.PageCache(0))
+    with bench.stubCurses():
+        yield bench.tui.TUI("vim")
+
+def test_lazy_page_snapshot_gets_every_link(ui):
+    html = link_page(5000)
+    ui.current_url = "http://example.test/index"
+    ui.display_html(html)
+    entry = ui.history.current
+    partial = entry.snapshot
+    assert len(partial.links) < 5000  # Recorded after the first screenful
+
+    ui.lazy_page.thread.join()
+    _, links, link_positions = parser.index_lines(parser.parse_lines(html, ui.current_url, "html.parser"))
+    restored_lines, restored_links, restored_positions = entry.snapshot.restore()
+    assert len(restored_lines) == len(ui.content_lines)
+    assert restored_links == links
+    assert restored_positions == link_positions
+    assert entry.snapshot.size > partial.size
+    assert ui.history.total_bytes == entry.snapshot.size
+
+def test_refetched_lazy_page_snapshot_gets_every_link(ui):
+    html = link_page(5000)
+    ui.current_url = "http://example.test/index"
+    ui.display_html(html)
+    ui.lazy_page.thread.join()
+    ui.current_url = "http://example.test/other"
+    ui.display_html(link_page(1))
+
+    # Going back to a page whose snapshot was evicted refetches it
+    ui.history._drop(ui.history.entries[0])
+    assert ui.go_history(-1)
+    ui.display_html(html)
+    entry = ui.history.current
+    assert entry is ui.history.entries[0]
+    ui.lazy_page.thread.join()
+    assert sum(len(spans) for _, spans in entry.snapshot.links) == 5000
+
+def test_refresh_skips_evicted_snapshots():
+    history = History(max_bytes=1 << 20)
+    lines = LineStore(["a", "b"])
+    history.visit("http://example.test/a", lines, {})
+    history.visit("http://example.test/b", LineStore(["c"]), {})
+    history._drop(history.entries[0])
+    history.refresh(lines, {1: (parser.Link("b", "http://example.test/b", 0, 1),)})
+    assert history.entries[0].snapshot is None
+    assert history.total_bytes == history.entries[1].snapshot.size
+
+def test_failed_refetch_undoes_history_move(ui, monkeypatch):
+    ui.current_url = "http://example.test/a"
+    ui.display_html(link_page(1))
+    ui.current_url = "http://example.test/b"
+    ui.display_html(link_page(2))
+    ui.history._drop(ui.history.entries[0])
+    monkeypatch.setattr(ui, "show_error", lambda message: None)
+    monkeypatch.setattr(ui, "wait_for", lambda load: None)  # The host is unreachable
+    monkeypatch.setattr(bench.tui, "PageLoad", lambda *args, **kwargs: None)
+
+    assert ui.go_history(-1)
+    assert ui.fetch_url(ui.current_url) is None
+    assert ui.history_move is None
+    assert ui.history.current.url == ui.page_url == "http://example.test/b"
+
+    # Opening another page keeps the one that was on screen in the history
+    ui.current_url = "http://example.test/c"
+    ui.display_html(link_page(3))
+    assert [entry.url for entry in ui.history.entries] == [
+        "http://example.test/a", "http://example.test/b", "http://example.test/c"
+    ]
+
+class Keys:
+    """Key queue standing in for the terminal's input."""
+
+    def __init__(self):
+        self.queue = []
+
+    def getch(self):
+        return self.queue.pop(0) if self.queue else -1
+
+    def ungetch(self, key):
+        self.queue.insert(0, key)
+
+class Load:
+    url = "http://example.test/b"
+    bytes_received = 0
+
+def test_back_while_streaming_keeps_snapshots(ui, monkeypatch):
+    ui.current_url = "http://example.test/a"
+    ui.display_html(link_page(1))
+    snapshot_a = ui.history.current.snapshot.restore()
+    keys = Keys()
+    monkeypatch.setattr(ui.screen, "getch", keys.getch, raising=False)
+    monkeypatch.setattr(bench.tui.curses, "ungetch", keys.ungetch)
+
+    def chunks():
+        html = link_page(50)
+        yield html[:len(html) // 2]
+        keys.queue.append(ord(ui.controls_map['back']))  # Pressed while the page streams
+        yield ""
+        yield html[len(html) // 2:]  # Never arrives
+
+    ui.current_url = "http://example.test/b"
+    ui.loading = Load()
+    assert ui.stream_html(chunks()) is None
+    assert ui.loading is None and ui.history_step is None
+
+    # The partial page is in the history, and the page before it is back on screen unchanged
+    assert [entry.url for entry in ui.history.entries] == ["http://example.test/a", "http://example.test/b"]
+    assert ui.history.current is ui.history.entries[0]
+    assert ui.page_url == ui.current_url == "http://example.test/a"
+    assert list(ui.content_lines) == list(snapshot_a[0])
+    assert ui.history.entries[0].snapshot.restore()[1] == snapshot_a[1]
+    partial = ui.history.entries[1].snapshot.restore()[0]
+    assert 0 < len(partial) < 50
@@ -0,0 +1,55 @@
+"""
+Tests for the on-disk HTTP response cache.
+"""
+
+# Standard library imports
+import threading
+import http.server
+
+# Third-party imports
+import pytest
+
+# Local imports
+import fetcher
+import httpcache
+
+class Handler(http.server.BaseHTTPRequestHandler):
+    requests = 0
+
+    def do_GET(self):
+        Handler.requests += 1
+        body = b"<html><body><p>cached</p></body></html>"
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Cache-Control", "max-age=600")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture
+def url(tmp_path, monkeypatch):
+    monkeypatch.setattr(fetcher, "cache", httpcache.ResponseCache(tmp_path, 1 << 20))
+    Handler.requests = 0
+    httpd = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_port}/page"
+    httpd.shutdown()
+    httpd.server_close()
+    fetcher.closeSession()
+
+def test_unverified_response_is_not_stored(url):
+    assert "cached" in fetcher.fetcher(url, verify=False)
+    assert fetcher.cache.lookup(url) is None
+    assert "cached" in "".join(fetcher.streamer(url, verify=False))
+    assert fetcher.cache.lookup(url) is None
+
+def test_unverified_request_bypasses_the_cache(url):
+    fetcher.fetcher(url)
+    fetcher.fetcher(url)
+    assert Handler.requests == 1  # Served fresh from the cache
+    fetcher.fetcher(url, verify=False)
+    assert Handler.requests == 2
@@ -0,0 +1,82 @@
+"""
+Conformance tests for the parser backends: every installed backend must
+produce the same (formatted_text, line_count) as html.parser.
+"""
+
+# Third-party imports
+import pytest
+
+# Local imports
+import parser
+
+BASE_URL = "http://example.test/docs/index.html"
+
+# Name -> HTML covering one thing the backends could disagree on
+CORPUS = {
+    "empty": "",
+    "plain_text": "<html><body><p>Hello, world.</p></body></html>",
+    "script_and_style": (
+        "<html><head><style>body { color: red }</style><script>var a = 1;</script></head>"
+        "<body><p>Visible</p><script>document.write('hidden')</script></body></html>"
+    ),
+    "comments": "<p>before<!-- hidden --> after</p><!-- <a href='/x'>commented out</a> -->",
+    "entities": "<p>Fish &amp; chips &lt;3 &copy; caf&eacute; &#8212; &nbsp;x</p>",
+    "relative_hrefs": (
+        "<a href='page.html'>sibling</a> <a href='/root'>root</a> <a href='../up'>up</a>"
+        " <a href='?q=1'>query</a> <a href='#frag'>fragment</a>"
+    ),
+    "absolute_and_other_schemes": (
+        "<a href='https://other.test/'>other</a> <a href='mailto:me@example.test'>mail</a>"
+        " <a href='javascript:void(0)'>script</a>"
+    ),
+    "empty_links": "<p>a<a href='/x'></a>b<a href='/y'>   </a>c<a>no href</a></p>",
+    "nested_markup_in_link": "<a href='/x'>one <b>two <i>three</i></b> four</a>",
+    "script_in_link": "<a href='/x'>foo<script>var a=1</script> bar</a>",
+    "style_and_comment_in_link": "<a href='/x'>foo<!-- c --> <b>bold</b><style>p {}</style>!</a>",
+    "link_with_only_script": "<p>x<a href='/y'><script>1</script></a>z</p>",
+    "multiline_link": "<a href='/x'>\n  spread\n  over\n\n  lines\n</a>",
+    "multiline_text": "<pre>line one\n  line two\n\nline four</pre>",
+    "lists_and_tables": (
+        "<ul><li>one</li><li><a href='/two'>two</a></li></ul>"
+        "<table><tr><th>Name</th><th>Value</th></tr><tr><td>a</td><td>1</td></tr></table>"
+    ),
+    "unicode": "<p>日本語 <a href='/ü'>Grüße</a> 😀</p>",
+    "cdata": "<p>before<![CDATA[bogus comment]]>after</p>",
+    "cdata_in_link": "<a href='/x'>a<![CDATA[hidden]]>b</a>",
+    "nested_links": "<a href='/outer'>outer <a href='/inner'>inner</a> tail</a>",
+    "nested_links_in_block": "<p><a href='/x'>one<div><a href='/y'>two</a></div>three</a></p>",
+    "anchor_without_href_in_link": "<a href='/x'>one <a name='n'>two</a> three</a>",
+    "ruby": "<p><ruby>漢<rp>(</rp><rt>kan</rt><rp>)</rp></ruby></p>",
+    "template": "<p>shown</p><template><p>hidden</p><a href='/t'>template link</a></template>",
+}
+
+INSTALLED = [name for name, (_, module) in parser.BACKENDS.items() if module is None or parser._installed(module)]
+
+@pytest.mark.parametrize("backend", [name for name in INSTALLED if name != parser.DEFAULT_BACKEND])
+@pytest.mark.parametrize("case", sorted(CORPUS))
+def test_backend_matches_html_parser(backend, case):
+    html = CORPUS[case]
+    expected = parser.parse(html, BASE_URL, parser.DEFAULT_BACKEND)
+    assert parser.parse(html, BASE_URL, backend) == expected
+
+@pytest.mark.parametrize("backend", INSTALLED)
+def test_backend_links(backend):
+    lines = parser.parse_lines(CORPUS["relative_hrefs"], BASE_URL, backend)
+    hrefs = [link.href for line in lines for link in line.links]
+    assert hrefs == [
+        "http://example.test/docs/page.html",
+        "http://example.test/root",
+        "http://example.test/up",
+        "http://example.test/docs/index.html?q=1",
+        "http://example.test/docs/index.html#frag",
+    ]
+
+# parse_lines() puts a placeholder line in for an empty body; the stream has no lines to show
+@pytest.mark.parametrize("piece_size", [None, 1, 7])
+@pytest.mark.parametrize("case", sorted(set(CORPUS) - {"empty"}))
+def test_stream_matches_parse_lines(case, piece_size):
+    html = CORPUS[case]
+    stream = parser.LineStream(BASE_URL)
+    pieces = [html] if piece_size is None else [html[i:i + piece_size] for i in range(0, len(html), piece_size)]
+    lines = [line for piece in pieces for line in stream.feed(piece)] + stream.close()
+    assert lines == parser.parse_lines(html, BASE_URL, 'html.parser')
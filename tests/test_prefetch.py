@@ -0,0 +1,152 @@
+"""
+Tests for how long the prefetcher serves the bodies it fetched.
+"""
+
+# Standard library imports
+import time
+import threading
+import http.server
+
+# Third-party imports
+import pytest
+
+# Local imports
+import app_confvars as confvars
+import bench
+import fetcher
+import pagecache
+from prefetch import Prefetcher, prefetcher
+
+# Seconds a test waits for a prefetch worker before failing
+TIMEOUT = 10
+
+# Path -> Cache-Control header sent with it (None sends none)
+CACHE_CONTROL = {
+    "/plain": None,
+    "/short": "max-age=1",
+    "/long": "max-age=3600",
+    "/no-store": "no-store",
+    "/no-cache": "no-cache",
+}
+
+# Size of the large bodies, far above the prefetch budget of the tests
+LARGE = 16 << 20
+
+class Handler(http.server.BaseHTTPRequestHandler):
+    sent = {}  # Path -> bytes of the body written
+
+    def do_GET(self):
+        if self.path in ("/large", "/unsized", "/binary"):
+            self.send_large()
+            return
+        body = f"<html><body><p>{self.path}</p></body></html>".encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        if CACHE_CONTROL.get(self.path):
+            self.send_header("Cache-Control", CACHE_CONTROL[self.path])
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_large(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "application/octet-stream" if self.path == "/binary" else "text/html")
+        if self.path != "/unsized":
+            self.send_header("Content-Length", str(LARGE))
+        self.end_headers()
+        chunk = b"<p>" + b"x" * 65532
+        Handler.sent[self.path] = 0
+        try:
+            while Handler.sent[self.path] < LARGE:
+                self.wfile.write(chunk)
+                Handler.sent[self.path] += len(chunk)
+        except OSError:  # The client hung up
+            pass
+        self.close_connection = True
+
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture
+def server(monkeypatch):
+    monkeypatch.setattr(fetcher.cache, "max_size", 0)  # Leave the HTTP cache out of it
+    monkeypatch.setattr(pagecache, "cache", pagecache.PageCache(0))
+    httpd = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_port}"
+    httpd.shutdown()
+    httpd.server_close()
+    fetcher.closeSession()
+
+def prefetch(prefetcher, url):
+    prefetcher._run(url, prefetcher.generation)  # In this thread, no executor needed
+
+def test_fresh_body_is_served(server):
+    prefetcher = Prefetcher(workers=1, max_bytes=1 << 20, host_delay=0, ttl=60)
+    for path in ("/plain", "/long"):
+        prefetch(prefetcher, server + path)
+        assert path in prefetcher.take(server + path)
+    assert prefetcher.stats["hits"] == 2
+
+@pytest.mark.parametrize("path", ["/no-store", "/no-cache"])
+def test_uncacheable_body_is_not_kept(server, path):
+    prefetcher = Prefetcher(workers=1, max_bytes=1 << 20, host_delay=0, ttl=60)
+    prefetch(prefetcher, server + path)
+    assert prefetcher.take(server + path) is None
+    assert prefetcher.total_bytes == 0
+
+def test_body_expires_after_max_age(server):
+    prefetcher = Prefetcher(workers=1, max_bytes=1 << 20, host_delay=0, ttl=60)
+    prefetch(prefetcher, server + "/short")
+    time.sleep(1.1)
+    assert prefetcher.take(server + "/short") is None
+    assert prefetcher.stats == {**prefetcher.stats, "misses": 1, "expired": 1, "hits": 0}
+    assert prefetcher.total_bytes == 0
+
+def test_body_expires_after_ttl(server):
+    prefetcher = Prefetcher(workers=1, max_bytes=1 << 20, host_delay=0, ttl=0.2)
+    prefetch(prefetcher, server + "/long")
+    time.sleep(0.3)
+    assert prefetcher.take(server + "/long") is None
+    assert prefetcher.stats["expired"] == 1
+
+def test_expired_body_is_fetched_again(server, monkeypatch):
+    prefetcher = Prefetcher(workers=1, max_bytes=1 << 20, host_delay=0, ttl=0.2)
+    prefetch(prefetcher, server + "/plain")
+    time.sleep(0.3)
+    done = threading.Event()
+    run = prefetcher._run
+
+    def tracked(*args):
+        try:
+            run(*args)
+        finally:
+            done.set()
+    monkeypatch.setattr(prefetcher, "_run", tracked)
+    prefetcher.schedule([server + "/plain"])
+    assert done.wait(TIMEOUT)
+    prefetcher.shutdown()
+    assert "/plain" in prefetcher.take(server + "/plain")
+
+def test_prefetch_links_schedules_at_most_the_configured_count(monkeypatch):
+    monkeypatch.setattr(confvars, "prefetch_links", 5)
+    monkeypatch.setattr(confvars, "lazy_parse_min_size", 0)
+    monkeypatch.setattr(prefetcher, "workers", 0)
+    scheduled = []
+    with bench.stubCurses():
+        ui = bench.tui.TUI("vim")
+        ui.current_url = "http://example.test/"
+        html = "<p>" + " ".join(f"<a href='/{i}'>{i}</a> <a href='/{i}b'>{i}b</a>" for i in range(20)) + "</p>"
+        ui.display_html(html)
+        monkeypatch.setattr(prefetcher, "workers", 1)
+        monkeypatch.setattr(prefetcher, "schedule", scheduled.extend)
+        ui.prefetch_links()
+    assert len(scheduled) == 5
+
+@pytest.mark.parametrize("path", ["/large", "/unsized", "/binary"])
+def test_large_or_binary_body_is_not_read(server, path):
+    prefetcher = Prefetcher(workers=1, max_bytes=1 << 20, host_delay=0, ttl=60)
+    prefetch(prefetcher, server + path)
+    assert prefetcher.take(server + path) is None
+    assert Handler.sent.get(path, 0) < LARGE
@@ -0,0 +1,13 @@
+"""
+Import-time regression test: starting the browser must not import the
+libraries that are only needed once a page is loaded.
+"""
+
+# Local imports
+import bench
+
+def test_startup_defers_heavy_imports():
+    imported = bench.importTimes("main")
+    assert "main" in imported
+    deferred = sorted(module for module in imported if module.split(".")[0] in bench.STARTUP_DEFERRED)
+    assert deferred == []
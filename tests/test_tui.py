@@ -0,0 +1,68 @@
+"""
+Tests for how the TUI waits for keys while pages load.
+"""
+
+# Third-party imports
+import pytest
+
+# Local imports
+import pagecache
+import bench
+from prefetch import prefetcher
+
+class DelayWindow(bench.StubWindow):
+    """Stub window that keeps the key delay set on it, and a queue of keys to read."""
+
+    def __init__(self, rows, cols):
+        super().__init__(rows, cols)
+        self.delay = -1
+        self.keys = []
+
+    def timeout(self, delay):
+        self.delay = delay
+
+    def nodelay(self, flag):
+        self.delay = 0 if flag else -1
+
+    def getch(self):
+        return self.keys.pop(0) if self.keys else -1
+
+    def ungetch(self, key):
+        self.keys.insert(0, key)
+
+class Load:
+    url = "http://example.test/page"
+    bytes_received = 0
+
+@pytest.fixture
+def ui(monkeypatch):
+    monkeypatch.setattr(prefetcher, "workers", 0)
+    monkeypatch.setattr(pagecache, "cache", pagecache.PageCache(0))
+    with bench.stubCurses():
+        ui = bench.tui.TUI("vim")
+        ui.screen = DelayWindow(40, 120)
+        monkeypatch.setattr(bench.tui.curses, "ungetch", ui.screen.ungetch)
+        yield ui
+
+def test_keys_read_while_streaming_keep_the_screen_non_blocking(ui):
+    delays = []
+
+    def chunks():
+        yield "<p>first</p>"
+        ui.screen.keys.append(ord(ui.controls_map['down']))  # Scrolling while the page streams
+        yield ""
+        delays.append(ui.screen.delay)
+        yield "<p>second</p>"
+
+    ui.current_url = Load.url
+    ui.loading = Load()
+    assert ui.stream_html(chunks()) is None
+    assert delays == [0]
+    assert ui.screen.delay == -1
+
+def test_resize_while_loading_keeps_the_screen_non_blocking(ui):
+    ui.current_url = Load.url
+    ui.loading = Load()
+    ui.set_delay(ui.screen, 0)  # As wait_for() sets it
+    ui.resize()  # Waits a moment for the resizes that follow
+    assert ui.screen.delay == 0